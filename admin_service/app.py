@@ -3,7 +3,7 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 from prometheus_flask_exporter import PrometheusMetrics
 from prometheus_client import Counter, Histogram, Gauge
-import requests
+import os
 import logging
 import time
 import threading
@@ -13,6 +13,7 @@ from datetime import datetime, timedelta
 import concurrent.futures
 import json
 from db_mongodb import get_mongodb_manager, with_read_db, with_write_db
+from http_client import ServiceHttpClient
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -47,6 +48,12 @@ MONGODB_REPLICATION_LAG = Gauge('ualflix_mongodb_replication_lag_seconds',
 SYSTEM_AVAILABILITY_PERCENT = Gauge('ualflix_system_availability_percent', 
                                    'Disponibilidade geral do sistema UALFlix')
 
+# Conexões keep-alive reutilizadas pelos health checks e coletores. Sem
+# repetições por omissão: um probe falhado é o próprio sinal, e tem de
+# terminar dentro do timeout de 2s usado em cada endpoint testado.
+HEALTH_CHECK_RETRIES = int(os.environ.get('HEALTH_CHECK_RETRIES', 0))
+http_client = ServiceHttpClient(retries=HEALTH_CHECK_RETRIES)
+
 class AutomaticMetricsCollector:
     """Coletor automático de métricas com suporte MongoDB"""
     
@@ -82,7 +89,7 @@ class AutomaticMetricsCollector:
                     
                     try:
                         health_url = f"{service_info['url']}/health"
-                        response = requests.get(health_url, timeout=2)
+                        response = http_client.get(health_url, timeout=2)
                         
                         latency = time.time() - start_time
                         
@@ -201,7 +208,7 @@ class AutomaticMetricsCollector:
                 
                 for service_name, service_info in services.items():
                     try:
-                        response = requests.get(f"{service_info['url']}/health", timeout=2)
+                        response = http_client.get(f"{service_info['url']}/health", timeout=2)
                         if response.status_code == 200:
                             healthy_count += 1
                     except Exception:
@@ -304,7 +311,7 @@ def check_service_health_advanced(service_name, service_info):
         for endpoint in test_endpoints:
             try:
                 test_url = f"{url}{endpoint}"
-                response = requests.get(test_url, timeout=2, auth=auth)
+                response = http_client.get(test_url, timeout=2, auth=auth)
                 if response.status_code == 200:
                     break
             except Exception:
@@ -584,7 +591,7 @@ def get_metrics_summary():
                     db.command('ping')
                     healthy_count += 1
                 else:
-                    response = requests.get(f"{service_info['url']}/health", timeout=2)
+                    response = http_client.get(f"{service_info['url']}/health", timeout=2)
                     if response.status_code == 200:
                         healthy_count += 1
             except:
@@ -0,0 +1,120 @@
+"""
+Cliente HTTP partilhado para chamadas entre serviços.
+
+Cada destino (esquema + host:porta) tem uma requests.Session própria com um
+pool de conexões keep-alive, pelo que as chamadas repetidas ao mesmo serviço
+reutilizam a conexão TCP em vez de a abrir a cada pedido. As falhas
+transitórias são repetidas pelo urllib3 com backoff exponencial:
+
+- erros de conexão são sempre repetidos (o pedido não chegou a sair);
+- erros de leitura e respostas 502/503/504 só em métodos idempotentes.
+
+A latência de cada chamada fica num histograma por destino.
+Este módulo existe em cópias idênticas em cada serviço que o usa.
+"""
+
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from prometheus_client import Histogram
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 10))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.1))
+HTTP_DEFAULT_TIMEOUT = float(os.environ.get('HTTP_DEFAULT_TIMEOUT', 5))
+
+HTTP_CLIENT_LATENCY = Histogram('ualflix_http_client_request_seconds',
+                                'Latência das chamadas HTTP entre serviços (com repetições)',
+                                ['target', 'method', 'status'],
+                                buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+
+
+class ServiceHttpClient:
+    """Sessões keep-alive por destino, criadas à primeira chamada."""
+
+    def __init__(self, pool_maxsize=HTTP_POOL_MAXSIZE, retries=HTTP_RETRIES,
+                 backoff_factor=HTTP_BACKOFF_FACTOR, timeout=HTTP_DEFAULT_TIMEOUT):
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self):
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False
+        )
+        # Um único host por sessão: um pool, com até pool_maxsize conexões ociosas
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def session_for(self, url):
+        """Devolve (sessão, destino) para o host de `url`."""
+        parts = urlsplit(url)
+        target = parts.netloc
+        key = (parts.scheme, target)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._sessions[key] = self._new_session()
+        return session, target
+
+    def request(self, method, url, **kwargs):
+        session, target = self.session_for(url)
+        kwargs.setdefault('timeout', self.timeout)
+        status = 'error'
+        start_time = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            HTTP_CLIENT_LATENCY.labels(target=target, method=method, status=status).observe(
+                time.perf_counter() - start_time
+            )
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            targets = sorted(netloc for _, netloc in self._sessions)
+        return {
+            "targets": targets,
+            "pool_maxsize": self.pool_maxsize,
+            "retries": self.retries
+        }
+
+
+# Singleton global
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client():
+    """Retorna instância singleton do cliente HTTP entre serviços"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = ServiceHttpClient()
+    return _http_client
@@ -6,6 +6,7 @@ import time
 import logging
 import json
 import uuid
+import hashlib
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta, timezone
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
@@ -50,6 +51,17 @@ def get_user_from_token(token):
         return session_data['user']
     return None
 
+@with_write_db
+def record_session_revocation(db, token):
+    """Publica o logout para as caches de tokens dos outros serviços."""
+    try:
+        db.revoked_sessions.insert_one({
+            'token_hash': hashlib.sha256(token.encode('utf-8')).hexdigest(),
+            'revoked_at': datetime.utcnow()
+        })
+    except Exception as e:
+        logger.error(f"Erro ao registar revogação de sessão: {e}")
+
 @with_write_db
 def create_user(db, username, email, password, is_admin=False):
     """Cria um novo usuário no MongoDB"""
@@ -220,6 +232,7 @@ def logout():
         
         if token and token in active_sessions:
             del active_sessions[token]
+            record_session_revocation(token)
         
         return jsonify({"success": True, "message": "Logged out successfully"}), 200
         
@@ -243,6 +243,20 @@ class MongoDBManager:
                 db.videos.create_index('user_id')
                 db.videos.create_index('status')
                 db.videos.create_index('upload_date')
+                db.videos.create_index('content_hash', sparse=True)
+                db.videos.create_index('deduplicated_from', sparse=True)
+            except Exception:
+                pass
+            
+            # Outbox de mensagens para o RabbitMQ (relay lê por available_at)
+            try:
+                db.outbox.create_index('available_at')
+            except Exception:
+                pass
+            
+            # Revogações de sessão (logout) lidas pelas caches de tokens
+            try:
+                db.revoked_sessions.create_index('revoked_at', expireAfterSeconds=3600)
             except Exception:
                 pass
             
@@ -1,16 +1,24 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from db_mongodb import get_mongodb_manager, with_write_db, with_read_db
+from queue_publisher import QueuePublisher
+from outbox import OutboxRelay, insert_with_outbox
+from token_cache import TokenCache, RevocationWatcher
+from http_client import get_http_client
 from prometheus_flask_exporter import PrometheusMetrics
 import os
 import time
 import logging
-import json
-import pika
-import requests
-from datetime import datetime
+import hashlib
+import uuid
+import re
+import threading
+from datetime import datetime, timedelta
 from bson import ObjectId
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from pymongo.errors import OperationFailure
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, Counter
+from werkzeug.exceptions import ClientDisconnected, RequestEntityTooLarge
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +32,11 @@ app.config['MAX_CONTENT_LENGTH'] = 1024 * 1024 * 1024  # 1GB
 # Configurar métricas Prometheus
 metrics = PrometheusMetrics(app)
 
+UPLOADS_DEDUPLICATED = Counter('catalog_uploads_deduplicated_total',
+                               'Uploads resolvidos para um vídeo já processado com o mesmo conteúdo')
+DEDUP_BYTES_SAVED = Counter('catalog_dedup_bytes_saved_total',
+                            'Bytes de disco poupados pela deduplicação de uploads')
+
 # Configuração do ambiente
 VIDEO_FOLDER = '/videos'
 os.makedirs(VIDEO_FOLDER, exist_ok=True)
@@ -32,60 +45,153 @@ os.makedirs(VIDEO_FOLDER, exist_ok=True)
 QUEUE_HOST = os.environ.get('QUEUE_HOST', 'queue_service')
 QUEUE_USER = os.environ.get('QUEUE_USER', 'ualflix')
 QUEUE_PASSWORD = os.environ.get('QUEUE_PASSWORD', 'ualflix_password')
+QUEUE_PUBLISHER_POOL_SIZE = int(os.environ.get('QUEUE_PUBLISHER_POOL_SIZE', 2))
+QUEUE_PUBLISH_BATCH_SIZE = int(os.environ.get('QUEUE_PUBLISH_BATCH_SIZE', 1))
+QUEUE_PUBLISH_TIMEOUT = float(os.environ.get('QUEUE_PUBLISH_TIMEOUT', 5))
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 1))
+
+# Tamanho dos blocos copiados (e incluídos no hash) durante o upload
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+
+# Uploads por blocos retomáveis: tamanho máximo total e validade das sessões
+UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', 1024 * 1024 * 1024))
+UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', 24 * 3600))
+# Lease da finalização: passado este prazo outro pedido pode retomá-la
+# (processo morto a meio do hash/registo)
+UPLOAD_FINALIZE_LEASE = int(os.environ.get('UPLOAD_FINALIZE_LEASE', 600))
+
+# Tamanho máximo dos campos de texto do formulário de upload (título, descrição)
+UPLOAD_FORM_FIELD_MAX = int(os.environ.get('UPLOAD_FORM_FIELD_MAX', 64 * 1024))
+
+# Reutilizar vídeos já processados com o mesmo conteúdo (SHA-256)
+UPLOAD_DEDUP_ENABLED = os.environ.get('UPLOAD_DEDUP_ENABLED', 'true').lower() == 'true'
 
 # URL do serviço de autenticação
 AUTH_SERVICE_URL = os.environ.get('AUTH_SERVICE_URL', 'http://authentication_service:8000')
 
-def get_rabbitmq_connection():
-    """Conecta ao RabbitMQ."""
-    try:
-        credentials = pika.PlainCredentials(QUEUE_USER, QUEUE_PASSWORD)
-        parameters = pika.ConnectionParameters(
-            host=QUEUE_HOST,
-            credentials=credentials,
-            heartbeat=600,
-            blocked_connection_timeout=300
-        )
-        connection = pika.BlockingConnection(parameters)
-        channel = connection.channel()
-        
-        # Declarar a fila
-        channel.queue_declare(queue='video_processing', durable=True)
-        
-        return connection, channel
-    except Exception as e:
-        logger.error(f"Erro ao conectar ao RabbitMQ: {e}")
-        return None, None
+# Cache de validação de tokens (segundos; revogações por logout lidas a cada poll)
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = float(os.environ.get('TOKEN_CACHE_TTL', 60))
+# Cache negativa desligada por omissão: as sessões vivem em memória em cada
+# réplica do authentication_service, pelo que um 401 da réplica que não
+# emitiu o token não significa que o token seja inválido
+TOKEN_CACHE_NEGATIVE_TTL = float(os.environ.get('TOKEN_CACHE_NEGATIVE_TTL', 0))
+TOKEN_REVOCATION_POLL_INTERVAL = float(os.environ.get('TOKEN_REVOCATION_POLL_INTERVAL', 1))
+
+# Publicador persistente (conexões reutilizadas, publisher confirms)
+queue_publisher = QueuePublisher(
+    QUEUE_HOST,
+    QUEUE_USER,
+    QUEUE_PASSWORD,
+    'video_processing',
+    pool_size=QUEUE_PUBLISHER_POOL_SIZE,
+    batch_size=QUEUE_PUBLISH_BATCH_SIZE
+)
+
+# Relay da outbox: as mensagens de processamento são gravadas com o vídeo
+# e publicadas em background
+outbox_relay = OutboxRelay(
+    queue_publisher,
+    batch_size=OUTBOX_BATCH_SIZE,
+    poll_interval=OUTBOX_POLL_INTERVAL,
+    publish_timeout=QUEUE_PUBLISH_TIMEOUT
+)
+outbox_relay.start()
+
+def receive_multipart_upload(stream, boundary):
+    """Lê o corpo multipart/form-data em streaming, sem passar pelo request.files.
+    
+    O conteúdo do campo `file` vai direto para um arquivo temporário oculto
+    em /videos (mesmo sistema de arquivos do destino, pelo que a gravação
+    final é só um rename), com tamanho e SHA-256 calculados na mesma passagem.
+    Devolve (campos, nome original, caminho temporário, tamanho, sha256); o
+    caminho é None se o pedido não trouxer arquivo.
+    """
+    # O limite do decoder aplica-se ao seu buffer interno, que recebe um
+    # bloco inteiro de cada vez; o tamanho dos campos é verificado abaixo
+    decoder = MultipartDecoder(boundary, max_form_memory_size=UPLOAD_CHUNK_SIZE + UPLOAD_FORM_FIELD_MAX)
+    fields = {}
+    field_data = []
+    field_size = 0
+    current = None
+    out = None
+    temp_path = None
+    filename = None
+    digest = hashlib.sha256()
+    size = 0
 
-def send_to_processing_queue(video_data):
-    """Envia dados do vídeo para a fila de processamento."""
     try:
-        connection, channel = get_rabbitmq_connection()
-        if channel:
-            message = json.dumps(video_data, default=str)  # default=str para ObjectId
-            channel.basic_publish(
-                exchange='',
-                routing_key='video_processing',
-                body=message,
-                properties=pika.BasicProperties(delivery_mode=2)  # Torna a mensagem persistente
-            )
-            connection.close()
-            logger.info(f"Vídeo enviado para processamento: {video_data['filename']}")
-            return True
-    except Exception as e:
-        logger.error(f"Erro ao enviar para fila de processamento: {e}")
-    return False
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, File):
+                    current = event
+                    if event.name == 'file' and event.filename and out is None:
+                        filename = os.path.basename(event.filename)
+                        temp_path = os.path.join(VIDEO_FOLDER, f".upload-{uuid.uuid4().hex}.tmp")
+                        out = open(temp_path, 'wb', buffering=UPLOAD_CHUNK_SIZE)
+                elif isinstance(event, Field):
+                    current = event
+                    field_data = []
+                    field_size = 0
+                elif isinstance(event, Data):
+                    if isinstance(current, Field):
+                        field_size += len(event.data)
+                        if field_size > UPLOAD_FORM_FIELD_MAX:
+                            raise RequestEntityTooLarge()
+                        field_data.append(event.data)
+                        if not event.more_data:
+                            fields[current.name] = b''.join(field_data).decode('utf-8', 'replace')
+                    elif out is not None and current.name == 'file':
+                        out.write(event.data)
+                        digest.update(event.data)
+                        size += len(event.data)
+                event = decoder.next_event()
+            if isinstance(event, Epilogue):
+                break
+            if not chunk:
+                raise ValueError("Corpo multipart incompleto")
+        if out is not None:
+            out.close()
+    except Exception:
+        if out is not None:
+            out.close()
+            os.remove(temp_path)
+        raise
+
+    return fields, filename, temp_path, size, digest.hexdigest()
+
+# Cache local das validações de token (0 entradas = desativada)
+token_cache = TokenCache(
+    ttl=TOKEN_CACHE_TTL,
+    negative_ttl=TOKEN_CACHE_NEGATIVE_TTL,
+    max_entries=TOKEN_CACHE_SIZE
+)
+if token_cache.enabled:
+    RevocationWatcher(token_cache, interval=TOKEN_REVOCATION_POLL_INTERVAL).start()
 
 def validate_user_token(token):
-    """Valida token do usuário com o serviço de autenticação."""
+    """Valida token do usuário com o serviço de autenticação (com cache local)."""
+    if token_cache.enabled:
+        found, user = token_cache.get(token)
+        if found:
+            return user
     try:
-        response = requests.post(
+        response = get_http_client().post(
             f"{AUTH_SERVICE_URL}/validate",
             json={"token": token},
             timeout=5
         )
         if response.status_code == 200:
-            return response.json().get('user')
+            user = response.json().get('user')
+            token_cache.put(token, user)
+            return user
+        if response.status_code == 401:
+            # Token inválido ou expirado: cache negativa (se TOKEN_CACHE_NEGATIVE_TTL > 0)
+            token_cache.put(token, None)
     except Exception as e:
         logger.error(f"Erro ao validar token: {e}")
     return None
@@ -94,10 +200,30 @@ def metrics():
     """Endpoint para Prometheus coletar métricas"""
     return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
 
+# Campos herdados do vídeo original quando um upload é deduplicado
+PROCESSED_FIELDS = ('filename', 'url', 'status', 'duration', 'file_size', 'thumbnail_path',
+                    'progressive_ready', 'packaging', 'seek_preview')
+
+@with_read_db
+def find_processed_video_by_hash(db, content_hash):
+    """Procura um vídeo já processado (ativo) com o mesmo conteúdo."""
+    return db.videos.find_one(
+        {'content_hash': content_hash, 'status': 'active'},
+        sort=[('upload_date', 1)]
+    )
+
 @with_write_db
-def create_video_record(db, title, description, filename, url, user_id):
-    """Cria registro do vídeo no MongoDB"""
+def create_video_record(db, title, description, filename, url, user_id, content_hash=None, original=None,
+                        processing_message=None):
+    """Cria registro do vídeo no MongoDB
+    
+    Com `original` (vídeo já processado com o mesmo conteúdo) o registo
+    aponta para o mesmo arquivo e herda os resultados do processamento.
+    Com `processing_message` a mensagem para a fila de processamento é
+    gravada na outbox na mesma transação.
+    """
     video_doc = {
+        '_id': ObjectId(),
         'title': title,
         'description': description,
         'filename': filename,
@@ -108,11 +234,23 @@ def create_video_record(db, title, description, filename, url, user_id):
         'status': 'processing',
         'duration': 0,
         'file_size': 0,
-        'thumbnail_path': None
+        'thumbnail_path': None,
+        'progressive_ready': False,
+        'content_hash': content_hash
     }
     
-    result = db.videos.insert_one(video_doc)
-    return result.inserted_id
+    if original:
+        for field in PROCESSED_FIELDS:
+            if field in original:
+                video_doc[field] = original[field]
+        video_doc['deduplicated_from'] = original['_id']
+    
+    if processing_message is not None:
+        processing_message['id'] = str(video_doc['_id'])
+        insert_with_outbox(db, 'videos', video_doc, 'video_processing', processing_message)
+    else:
+        db.videos.insert_one(video_doc)
+    return video_doc['_id']
 
 @with_read_db
 def get_videos_list(db, user_id=None, limit=None):
@@ -202,6 +340,80 @@ def get_video_by_id(db, video_id):
         logger.error(f"Erro ao buscar vídeo {video_id}: {e}")
         return None
 
+def ensure_upload_session_ttl(db):
+    """Sessões expiram UPLOAD_SESSION_TTL após o último bloco, o mesmo prazo
+    usado por cleanup_stale_uploads para os arquivos parciais."""
+    try:
+        db.upload_sessions.create_index('updated_at', expireAfterSeconds=UPLOAD_SESSION_TTL)
+    except OperationFailure:
+        # Índice criado com outro prazo: ajustá-lo ao valor configurado
+        db.command('collMod', 'upload_sessions',
+                   index={'keyPattern': {'updated_at': 1}, 'expireAfterSeconds': UPLOAD_SESSION_TTL})
+
+# O índice TTL é garantido uma vez por processo, na primeira sessão criada
+upload_session_ttl_ready = False
+
+@with_write_db
+def create_upload_session(db, session_doc):
+    """Cria a sessão de um upload por blocos."""
+    global upload_session_ttl_ready
+    if not upload_session_ttl_ready:
+        try:
+            ensure_upload_session_ttl(db)
+            upload_session_ttl_ready = True
+        except Exception as e:
+            logger.warning(f"Erro ao criar índice TTL das sessões de upload: {e}")
+    db.upload_sessions.insert_one(session_doc)
+    return session_doc['_id']
+
+@with_write_db
+def get_upload_session(db, upload_id):
+    """Obtém a sessão de upload (primário, para ler o offset mais recente)."""
+    return db.upload_sessions.find_one({'_id': upload_id})
+
+@with_write_db
+def advance_upload_session(db, upload_id, received):
+    """Regista os bytes recebidos; nunca recua o offset."""
+    db.upload_sessions.update_one(
+        {'_id': upload_id, 'status': 'open'},
+        {'$max': {'received': received}, '$set': {'updated_at': datetime.utcnow()}}
+    )
+
+@with_write_db
+def claim_upload_session(db, upload_id, user_id):
+    """Marca a sessão completa como 'finalizing' (só um pedido a finaliza).
+    
+    Devolve (sessão, estado) com estado 'claimed', 'incomplete' ou
+    'in_progress'. Uma finalização com lease expirado (finalizing_at mais
+    antigo que UPLOAD_FINALIZE_LEASE) pode ser retomada.
+    """
+    session = db.upload_sessions.find_one({'_id': upload_id, 'user_id': user_id})
+    if not session:
+        return None, None
+    if session['received'] < session['size']:
+        return session, 'incomplete'
+    now = datetime.utcnow()
+    result = db.upload_sessions.update_one(
+        {'_id': upload_id, '$or': [
+            {'status': 'open'},
+            {'status': 'finalizing', 'finalizing_at': {'$lt': now - timedelta(seconds=UPLOAD_FINALIZE_LEASE)}}
+        ]},
+        {'$set': {'status': 'finalizing', 'finalizing_at': now, 'updated_at': now}}
+    )
+    return session, 'claimed' if result.modified_count == 1 else 'in_progress'
+
+@with_write_db
+def reopen_upload_session(db, upload_id):
+    """Devolve a sessão a 'open' se a finalização falhar."""
+    db.upload_sessions.update_one(
+        {'_id': upload_id, 'status': 'finalizing'},
+        {'$set': {'status': 'open', 'updated_at': datetime.utcnow()}}
+    )
+
+@with_write_db
+def delete_upload_session(db, upload_id):
+    db.upload_sessions.delete_one({'_id': upload_id})
+
 @with_write_db
 def increment_view_count(db, video_id, user_id=None):
     """Incrementa contador de visualizações"""
@@ -228,6 +440,99 @@ def increment_view_count(db, video_id, user_id=None):
         logger.error(f"Erro ao incrementar visualização: {e}")
         return False
 
+def move_to_final_path(temp_path, safe_filename):
+    """Move o temporário para /videos sem substituir um arquivo existente.
+    
+    os.link falha se o destino já existir (ex.: dois uploads com o mesmo nome
+    no mesmo segundo); nesse caso o nome ganha um sufixo aleatório. Devolve
+    (nome final, caminho final).
+    """
+    stem, ext = os.path.splitext(safe_filename)
+    name = safe_filename
+    while True:
+        filepath = os.path.join(VIDEO_FOLDER, name)
+        try:
+            os.link(temp_path, filepath)
+        except FileExistsError:
+            name = f"{stem}_{uuid.uuid4().hex[:8]}{ext}"
+            continue
+        except OSError:
+            # Sistema de arquivos sem hard links: um nome único basta
+            name = f"{stem}_{uuid.uuid4().hex}{ext}"
+            filepath = os.path.join(VIDEO_FOLDER, name)
+            os.replace(temp_path, filepath)
+            return name, filepath
+        os.remove(temp_path)
+        return name, filepath
+
+def register_upload(user, title, description, safe_filename, temp_path, file_size, content_hash):
+    """Regista um upload completo (arquivo temporário já gravado em /videos).
+    
+    Conteúdo idêntico já processado reutiliza o arquivo e os resultados do
+    processamento; caso contrário o arquivo é movido para o nome final, o
+    registo é criado e o vídeo segue para a fila de processamento.
+    """
+    original = find_processed_video_by_hash(content_hash) if UPLOAD_DEDUP_ENABLED else None
+    if original:
+        video_id = create_video_record(
+            title=title,
+            description=description,
+            filename=original['filename'],
+            url=original['url'],
+            user_id=ObjectId(user['id']),
+            content_hash=content_hash,
+            original=original
+        )
+        os.remove(temp_path)
+        UPLOADS_DEDUPLICATED.inc()
+        DEDUP_BYTES_SAVED.inc(file_size)
+        logger.info(f"Upload deduplicado: {safe_filename} -> {original['filename']}")
+
+        return {
+            "message": "Video uploaded successfully!",
+            "filename": original['filename'],
+            "url": original['url'],
+            "video_id": str(video_id),
+            "deduplicated": True
+        }
+
+    safe_filename, filepath = move_to_final_path(temp_path, safe_filename)
+
+    # Gerar a URL
+    url = f"/stream/{safe_filename}"
+
+    # Criar registro no MongoDB, com a mensagem para a fila de
+    # processamento gravada na outbox na mesma transação
+    video_data = {
+        'filename': safe_filename,
+        'title': title,
+        'user_id': user['id'],
+        'filepath': filepath
+    }
+    try:
+        video_id = create_video_record(
+            title=title,
+            description=description,
+            filename=safe_filename,
+            url=url,
+            user_id=ObjectId(user['id']),
+            content_hash=content_hash,
+            processing_message=video_data
+        )
+    except Exception:
+        # Sem registo o arquivo volta ao caminho temporário, para que um
+        # novo pedido de finalização (ou a limpeza) o encontre
+        os.replace(filepath, temp_path)
+        raise
+    outbox_relay.notify()
+
+    return {
+        "message": "Video uploaded successfully!",
+        "filename": safe_filename,
+        "url": url,
+        "video_id": str(video_id)
+    }
+
 @app.route('/health', methods=['GET'])
 def health_check():
     try:
@@ -271,51 +576,281 @@ def upload_video():
         if not user:
             return jsonify({"error": "Token inválido ou expirado"}), 401
 
-        title = request.form.get('title', '')
-        description = request.form.get('description', '')
-        file = request.files['file']
-
-        if file and file.filename:
-            timestamp = str(int(time.time()))
-            safe_filename = timestamp + "_" + file.filename
-            filepath = os.path.join(VIDEO_FOLDER, safe_filename)
-            file.save(filepath)
-
-            # Gerar a URL
-            url = f"/stream/{safe_filename}"
-
-            # Criar registro no MongoDB
-            video_id = create_video_record(
-                title=title,
-                description=description,
-                filename=safe_filename,
-                url=url,
-                user_id=ObjectId(user['id'])
-            )
-
-            # Enviar para fila de processamento
-            video_data = {
-                'id': str(video_id),
-                'filename': safe_filename,
-                'title': title,
-                'user_id': user['id'],
-                'filepath': filepath
-            }
-            send_to_processing_queue(video_data)
-
-            return jsonify({
-                "message": "Video uploaded successfully!",
-                "filename": safe_filename,
-                "url": url,
-                "video_id": str(video_id)
-            }), 200
+        boundary = request.mimetype_params.get('boundary')
+        if request.mimetype != 'multipart/form-data' or not boundary:
+            return jsonify({"error": "No file uploaded"}), 400
+
+        fields, filename, temp_path, file_size, content_hash = receive_multipart_upload(
+            request.stream, boundary.encode('latin-1')
+        )
+
+        if temp_path:
+            safe_filename = str(int(time.time())) + "_" + filename
+            try:
+                result = register_upload(user, fields.get('title', ''), fields.get('description', ''),
+                                         safe_filename, temp_path, file_size, content_hash)
+            except Exception:
+                # Sem retomada no /upload: o temporário devolvido não serve a ninguém
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            return jsonify(result), 200
         else:
             return jsonify({"error": "No file uploaded"}), 400
             
+    except RequestEntityTooLarge:
+        return jsonify({"error": "Request too large"}), 413
+    except (ValueError, ClientDisconnected) as e:
+        # Corpo malformado ou truncado (cliente desligou a meio do upload)
+        logger.warning(f"Upload multipart inválido: {e}")
+        return jsonify({"error": "Invalid multipart body"}), 400
     except Exception as e:
         logger.error(f"Erro no upload: {e}")
         return jsonify({"error": str(e)}), 500
 
+# Estado do SHA-256 dos uploads por blocos recebidos em sequência neste
+# processo; se se perder (reinício, blocos fora de ordem) o hash é
+# recalculado a partir do disco na finalização
+upload_hashers = {}
+upload_hashers_lock = threading.Lock()
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+def upload_part_path(upload_id):
+    return os.path.join(VIDEO_FOLDER, f".upload-{upload_id}.part")
+
+def cleanup_stale_uploads():
+    """Remove blocos parciais de sessões abandonadas (a coleção expira por TTL)."""
+    cutoff = time.time() - UPLOAD_SESSION_TTL
+    with os.scandir(VIDEO_FOLDER) as entries:
+        for entry in entries:
+            if entry.name.startswith('.upload-') and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+def write_upload_chunk(upload_id, stream, offset, length):
+    """Grava `length` bytes do pedido em `offset` do arquivo parcial (pwrite)."""
+    with upload_hashers_lock:
+        hasher = upload_hashers.get(upload_id)
+        if isinstance(hasher, tuple) and hasher[1] == offset:
+            # O hasher fica reservado a este pedido enquanto grava
+            owner = upload_hashers[upload_id] = object()
+        else:
+            # Bloco fora de sequência ou outro pedido a gravar em simultâneo
+            # (ex.: retry do cliente): o hash será recalculado na finalização
+            upload_hashers.pop(upload_id, None)
+            hasher = owner = None
+
+    written = 0
+    fd = os.open(upload_part_path(upload_id), os.O_WRONLY)
+    try:
+        while written < length:
+            try:
+                chunk = stream.read(min(UPLOAD_CHUNK_SIZE, length - written))
+            except ClientDisconnected:
+                # Corpo truncado: fica o que já foi gravado, o cliente retoma daí
+                break
+            if not chunk:
+                break
+            os.pwrite(fd, chunk, offset + written)
+            if hasher is not None:
+                hasher[0].update(chunk)
+            written += len(chunk)
+    finally:
+        os.close(fd)
+
+    if hasher is not None:
+        with upload_hashers_lock:
+            # Só devolve o hasher se nenhum outro pedido gravou entretanto
+            if upload_hashers.get(upload_id) is owner:
+                upload_hashers[upload_id] = (hasher[0], offset + written)
+    return written
+
+def upload_content_hash(upload_id, part_path, size):
+    """SHA-256 do upload completo, do estado incremental ou relendo o arquivo."""
+    with upload_hashers_lock:
+        hasher = upload_hashers.pop(upload_id, None)
+    if isinstance(hasher, tuple) and hasher[1] == size:
+        return hasher[0].hexdigest()
+    digest = hashlib.sha256()
+    with open(part_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def authenticated_user():
+    token = request.headers.get('X-Session-Token')
+    return validate_user_token(token) if token else None
+
+def upload_session_status(session):
+    return {
+        "upload_id": session['_id'],
+        "filename": session['filename'],
+        "size": session['size'],
+        "offset": session['received'],
+        "chunk_size": UPLOAD_CHUNK_SIZE,
+        "status": session['status']
+    }
+
+@app.route('/upload/sessions', methods=['POST'])
+def create_upload():
+    """Inicia um upload por blocos retomável."""
+    try:
+        user = authenticated_user()
+        if not user:
+            return jsonify({"error": "Token inválido ou expirado"}), 401
+
+        data = request.get_json(silent=True) or {}
+        filename = os.path.basename(data.get('filename') or '')
+        size = data.get('size')
+        if not filename or not isinstance(size, int) or size <= 0:
+            return jsonify({"error": "filename and positive integer size are required"}), 400
+        if size > UPLOAD_MAX_SIZE:
+            return jsonify({"error": "File too large"}), 413
+
+        cleanup_stale_uploads()
+
+        upload_id = uuid.uuid4().hex
+        # Arquivo parcial oculto no mesmo sistema de arquivos do destino:
+        # a finalização é só um rename, sem voltar a copiar os dados
+        with open(upload_part_path(upload_id), 'wb') as f:
+            f.truncate(size)
+        with upload_hashers_lock:
+            upload_hashers[upload_id] = (hashlib.sha256(), 0)
+
+        now = datetime.utcnow()
+        session = {
+            '_id': upload_id,
+            'user_id': ObjectId(user['id']),
+            'filename': filename,
+            'title': data.get('title', ''),
+            'description': data.get('description', ''),
+            'size': size,
+            'received': 0,
+            'status': 'open',
+            'created_at': now,
+            'updated_at': now
+        }
+        create_upload_session(session)
+        logger.info(f"Sessão de upload {upload_id} iniciada: {filename} ({size / (1024*1024):.2f} MB)")
+
+        return jsonify(upload_session_status(session)), 201
+
+    except Exception as e:
+        logger.error(f"Erro ao iniciar upload: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/upload/sessions/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Offset confirmado, para o cliente retomar depois de uma falha."""
+    user = authenticated_user()
+    if not user:
+        return jsonify({"error": "Token inválido ou expirado"}), 401
+    session = get_upload_session(upload_id)
+    if not session or str(session['user_id']) != user['id']:
+        return jsonify({"error": "Upload session not found"}), 404
+    return jsonify(upload_session_status(session))
+
+@app.route('/upload/sessions/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Recebe um bloco (Content-Range: bytes início-fim/total) e grava-o no offset."""
+    try:
+        user = authenticated_user()
+        if not user:
+            return jsonify({"error": "Token inválido ou expirado"}), 401
+
+        session = get_upload_session(upload_id)
+        if not session or str(session['user_id']) != user['id']:
+            return jsonify({"error": "Upload session not found"}), 404
+        if session['status'] == 'finalizing':
+            return jsonify({"error": "Upload finalization in progress"}), 409
+        if session['status'] != 'open':
+            return jsonify({"error": "Upload session is not open"}), 409
+
+        match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return jsonify({"error": "Content-Range header required"}), 400
+        start, end, total = (int(value) for value in match.groups())
+        if total != session['size'] or end < start or end >= total:
+            return jsonify({"error": "Invalid Content-Range"}), 416
+        if start > session['received']:
+            # Deixaria um buraco no arquivo: o cliente deve retomar no offset atual
+            return jsonify({"error": "Chunk does not start at the current offset",
+                            "offset": session['received']}), 409
+
+        length = end - start + 1
+        written = write_upload_chunk(upload_id, request.stream, start, length)
+        if written < length:
+            # Ligação interrompida: guardar o que chegou para retomar daí
+            advance_upload_session(upload_id, start + written)
+            return jsonify({"error": "Incomplete chunk", "offset": max(session['received'], start + written)}), 400
+
+        advance_upload_session(upload_id, end + 1)
+        return jsonify({"upload_id": upload_id, "offset": max(session['received'], end + 1)}), 200
+
+    except Exception as e:
+        logger.error(f"Erro ao gravar bloco do upload {upload_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/upload/sessions/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """Completa o upload: cria o registo do vídeo e envia-o para processamento."""
+    try:
+        user = authenticated_user()
+        if not user:
+            return jsonify({"error": "Token inválido ou expirado"}), 401
+
+        session, state = claim_upload_session(upload_id, ObjectId(user['id']))
+        if not session:
+            return jsonify({"error": "Upload session not found"}), 404
+        if state == 'incomplete':
+            return jsonify({"error": "Upload incomplete",
+                            "offset": session['received'], "size": session['size']}), 409
+        if state == 'in_progress':
+            return jsonify({"error": "Upload finalization in progress"}), 409
+
+        part_path = upload_part_path(upload_id)
+        if not os.path.exists(part_path):
+            # Finalização anterior interrompida depois de mover o arquivo
+            delete_upload_session(upload_id)
+            return jsonify({"error": "Upload data no longer available"}), 410
+
+        try:
+            content_hash = upload_content_hash(upload_id, part_path, session['size'])
+            safe_filename = str(int(time.time())) + "_" + session['filename']
+            result = register_upload(user, session['title'], session['description'],
+                                     safe_filename, part_path, session['size'], content_hash)
+        except Exception:
+            reopen_upload_session(upload_id)
+            raise
+        delete_upload_session(upload_id)
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        logger.error(f"Erro ao finalizar upload {upload_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/upload/sessions/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    """Cancela o upload e remove o arquivo parcial."""
+    user = authenticated_user()
+    if not user:
+        return jsonify({"error": "Token inválido ou expirado"}), 401
+    session = get_upload_session(upload_id)
+    if not session or str(session['user_id']) != user['id']:
+        return jsonify({"error": "Upload session not found"}), 404
+    delete_upload_session(upload_id)
+    with upload_hashers_lock:
+        upload_hashers.pop(upload_id, None)
+    try:
+        os.remove(upload_part_path(upload_id))
+    except FileNotFoundError:
+        pass
+    return jsonify({"message": "Upload aborted"}), 200
+
 @app.route('/videos', methods=['GET'])
 def list_videos():
     try:
@@ -346,7 +881,8 @@ def list_videos():
                 'uploaded_by': video.get('uploaded_by', 'Unknown'),
                 'view_count': video.get('view_count', 0),
                 'status': video.get('status', 'active'),
-                'duration': video.get('duration', 0)
+                'duration': video.get('duration', 0),
+                'progressive_ready': video.get('progressive_ready', False)
             }
             videos_list.append(video_data)
         
@@ -383,7 +919,8 @@ def get_video(video_id):
                 'uploaded_by': video.get('uploaded_by', 'Unknown'),
                 'view_count': video.get('view_count', 0),
                 'status': video.get('status', 'active'),
-                'duration': video.get('duration', 0)
+                'duration': video.get('duration', 0),
+                'progressive_ready': video.get('progressive_ready', False)
             }
             
             return jsonify(video_data)
@@ -420,7 +957,8 @@ def get_my_videos():
                 'uploaded_by': video.get('uploaded_by', 'Unknown'),
                 'view_count': video.get('view_count', 0),
                 'status': video.get('status', 'active'),
-                'duration': video.get('duration', 0)
+                'duration': video.get('duration', 0),
+                'progressive_ready': video.get('progressive_ready', False)
             }
             videos_list.append(video_data)
         
@@ -450,6 +988,9 @@ def get_catalog_stats():
             "database_metrics": db_metrics,
             "replica_set_status": replica_status,
             "replication_test": replication_test,
+            "outbox": outbox_relay.stats(),
+            "token_cache": token_cache.stats(),
+            "http_client": get_http_client().stats(),
             "timestamp": datetime.utcnow().isoformat()
         })
         
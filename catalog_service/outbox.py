@@ -0,0 +1,183 @@
+"""
+Outbox transacional para a passagem upload -> processamento.
+
+O pedido de upload grava o documento do vídeo e a mensagem destinada à fila
+na mesma transação MongoDB (coleção `outbox`) e não fala com o RabbitMQ.
+Um relay em background lê a outbox em lotes, publica as mensagens com
+confirmação do broker e só então as apaga: uma falha do RabbitMQ atrasa o
+processamento mas nunca perde o trabalho.
+
+Cada lote é reclamado com um lease (available_at no futuro + owner), pelo
+que várias instâncias do catálogo podem correr o relay em simultâneo; uma
+mensagem de um relay que morreu volta a ficar disponível quando o lease
+expira (entrega at-least-once).
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from prometheus_client import Counter
+
+from db_mongodb import get_mongodb_manager
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_PUBLISHED = Counter('catalog_outbox_published_total',
+                           'Mensagens da outbox publicadas e confirmadas')
+OUTBOX_RETRIES = Counter('catalog_outbox_retries_total',
+                         'Mensagens da outbox devolvidas para nova tentativa')
+
+
+def outbox_document(queue_name, payload):
+    now = datetime.utcnow()
+    return {
+        '_id': ObjectId(),
+        'queue': queue_name,
+        'payload': payload,
+        'created_at': now,
+        'available_at': now,
+        'attempts': 0
+    }
+
+
+# Resposta do `hello` por cliente (a topologia não muda em tempo de execução)
+_transaction_support = {}
+
+
+def supports_transactions(client):
+    """Pergunta ao servidor se aceita transações (membro de replica set ou mongos).
+
+    O tipo de topologia do cliente não serve: o MongoDBManager liga-se
+    primeiro com directConnection, e um primary de replica set aparece então
+    como 'Single' apesar de suportar transações.
+    """
+    key = id(client)
+    if key not in _transaction_support:
+        hello = client.admin.command('hello')
+        _transaction_support[key] = bool(hello.get('setName')) or hello.get('msg') == 'isdbgrid'
+    return _transaction_support[key]
+
+
+def insert_with_outbox(db, collection, document, queue_name, payload):
+    """Insere `document` e a mensagem da outbox atomicamente.
+
+    Num replica set usa uma transação; num servidor standalone (sem suporte
+    a transações) grava a outbox primeiro, para que uma falha a meio deixe no
+    máximo uma mensagem para um documento inexistente, nunca um documento
+    sem mensagem.
+    """
+    message = outbox_document(queue_name, payload)
+    client = db.client
+    if not supports_transactions(client):
+        db.outbox.insert_one(message)
+        db[collection].insert_one(document)
+        return
+
+    def write(session):
+        db[collection].insert_one(document, session=session)
+        db.outbox.insert_one(message, session=session)
+
+    with client.start_session() as session:
+        session.with_transaction(write)
+
+
+class OutboxRelay:
+    """Thread que drena a outbox para o RabbitMQ em lotes."""
+
+    def __init__(self, publisher, batch_size=100, poll_interval=1.0, lease_seconds=30,
+                 publish_timeout=10.0):
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        # publish_timeout é o prazo do lote inteiro; o lease tem de o cobrir
+        # com folga, ou outro relay reclama e republica o mesmo lote
+        self.lease_seconds = max(lease_seconds, 2 * publish_timeout)
+        self.publish_timeout = publish_timeout
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='outbox-relay')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def notify(self):
+        """Acorda o relay logo após um commit, sem esperar pelo poll."""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=self.poll_interval)
+            self._wakeup.clear()
+            try:
+                while self.drain_once() == self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"Erro no relay da outbox: {e}")
+                time.sleep(self.poll_interval)
+
+    def _claim(self, db):
+        now = datetime.utcnow()
+        owner = uuid.uuid4().hex
+        candidates = [doc['_id'] for doc in db.outbox.find(
+            {'available_at': {'$lte': now}}, {'_id': 1}
+        ).sort('available_at', 1).limit(self.batch_size)]
+        if not candidates:
+            return []
+        # Cada documento só é atualizado por um relay: os restantes falham o filtro
+        db.outbox.update_many(
+            {'_id': {'$in': candidates}, 'available_at': {'$lte': now}},
+            {'$set': {'available_at': now + timedelta(seconds=self.lease_seconds), 'owner': owner},
+             '$inc': {'attempts': 1}}
+        )
+        return list(db.outbox.find({'_id': {'$in': candidates}, 'owner': owner}).sort('created_at', 1))
+
+    def drain_once(self):
+        """Publica um lote; devolve o número de mensagens reclamadas."""
+        db = get_mongodb_manager().get_write_database()
+        batch = self._claim(db)
+        if not batch:
+            return 0
+
+        deadline = time.monotonic() + self.publish_timeout
+        futures = [
+            (doc, self.publisher.publish(json.dumps(doc['payload'], default=str), wait=False,
+                                         timeout=self.publish_timeout))
+            for doc in batch
+        ]
+        published, failed = [], []
+        for doc, future in futures:
+            try:
+                future.result(timeout=max(0, deadline - time.monotonic()))
+                published.append(doc['_id'])
+            except Exception as e:
+                # Não enviada dentro do prazo: cancelar para não sair depois de reagendada
+                future.cancel()
+                logger.warning(f"Mensagem {doc['_id']} da outbox não publicada: {e}")
+                failed.append(doc)
+
+        if published:
+            db.outbox.delete_many({'_id': {'$in': published}})
+            OUTBOX_PUBLISHED.inc(len(published))
+        for doc in failed:
+            # Backoff exponencial limitado antes da próxima tentativa
+            delay = min(300, 2 ** min(doc.get('attempts', 1), 8))
+            db.outbox.update_one(
+                {'_id': doc['_id']},
+                {'$set': {'available_at': datetime.utcnow() + timedelta(seconds=delay)}, '$unset': {'owner': ''}}
+            )
+            OUTBOX_RETRIES.inc()
+        return len(batch)
+
+    def stats(self):
+        db = get_mongodb_manager().get_read_database()
+        oldest = db.outbox.find_one({}, {'created_at': 1}, sort=[('created_at', 1)])
+        return {
+            "pending": db.outbox.count_documents({}),
+            "oldest_seconds": (datetime.utcnow() - oldest['created_at']).total_seconds() if oldest else 0
+        }
@@ -0,0 +1,162 @@
+"""
+Publicador persistente para o RabbitMQ.
+
+O pika BlockingConnection não é thread-safe, por isso cada thread do pool
+tem a sua conexão e o seu canal, abertos uma vez e reabertos só depois de
+uma falha. Os pedidos HTTP entregam as mensagens numa fila em memória e
+esperam (ou não) pela confirmação do broker:
+
+- batch_size = 1: canal em modo publisher confirms, cada mensagem é
+  confirmada individualmente;
+- batch_size > 1: a thread junta até batch_size mensagens pendentes e
+  confirma-as todas com um único tx_commit.
+
+Entre publicações as threads processam os heartbeats da conexão. Uma
+mensagem cujo prazo expirou (ou cujo Future foi cancelado) antes de ser
+enviada é descartada, para que quem desistiu de esperar não a veja
+publicada mais tarde.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import pika
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+PUBLISH_LATENCY = Histogram('catalog_queue_publish_seconds',
+                            'Tempo até o broker confirmar a publicação')
+PUBLISH_FAILURES = Counter('catalog_queue_publish_failures_total',
+                           'Publicações que falharam depois de todas as tentativas')
+PUBLISHER_RECONNECTS = Counter('catalog_queue_publisher_reconnects_total',
+                               'Conexões (re)abertas pelo publicador')
+
+
+class QueuePublisher:
+    """Pool de threads publicadoras com conexões de longa duração."""
+
+    def __init__(self, host, user, password, queue_name, pool_size=2, batch_size=1,
+                 max_attempts=3, heartbeat=60):
+        self.parameters = pika.ConnectionParameters(
+            host=host,
+            credentials=pika.PlainCredentials(user, password),
+            heartbeat=heartbeat,
+            blocked_connection_timeout=300
+        )
+        self.queue_name = queue_name
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max_attempts
+        self._idle_interval = max(1, heartbeat // 4)
+        self._pending = queue.Queue()
+        self._threads = []
+        for index in range(pool_size):
+            thread = threading.Thread(target=self._run, name=f"queue-publisher-{index}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def publish(self, body, wait=True, timeout=5.0):
+        """Publica `body` (persistente); com `wait` espera pela confirmação do broker.
+
+        Com `timeout` a mensagem deixa de ser enviada depois do prazo; sem
+        `wait` o chamador pode ainda cancelar o Future devolvido.
+        """
+        future = Future()
+        queued_at = time.monotonic()
+        deadline = queued_at + timeout if timeout else None
+        self._pending.put((body, future, 0, queued_at, deadline))
+        if not wait:
+            return future
+        try:
+            return future.result(timeout=timeout)
+        except Exception as e:
+            future.cancel()
+            logger.error(f"Publicação não confirmada: {e}")
+            return False
+
+    def _connect(self):
+        connection = pika.BlockingConnection(self.parameters)
+        channel = connection.channel()
+        channel.queue_declare(queue=self.queue_name, durable=True)
+        if self.batch_size > 1:
+            channel.tx_select()
+        else:
+            channel.confirm_delivery()
+        PUBLISHER_RECONNECTS.inc()
+        return connection, channel
+
+    def _next_batch(self):
+        try:
+            batch = [self._pending.get(timeout=self._idle_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _live_entries(self, batch):
+        """Descarta mensagens canceladas ou fora de prazo antes de as enviar."""
+        now = time.monotonic()
+        live = []
+        for entry in batch:
+            _, future, attempts, _, deadline = entry
+            # Na primeira tentativa o Future passa a "running" e deixa de poder ser cancelado
+            if attempts == 0 and not future.set_running_or_notify_cancel():
+                continue
+            if deadline is not None and now > deadline:
+                future.set_exception(TimeoutError("Prazo de publicação expirado"))
+                continue
+            live.append(entry)
+        return live
+
+    def _publish_batch(self, channel, batch):
+        properties = pika.BasicProperties(delivery_mode=2)  # Mensagem persistente
+        for body, _, _, _, _ in batch:
+            channel.basic_publish(
+                exchange='',
+                routing_key=self.queue_name,
+                body=body,
+                properties=properties,
+                mandatory=self.batch_size == 1
+            )
+        if self.batch_size > 1:
+            channel.tx_commit()
+
+    def _run(self):
+        connection = channel = None
+        while True:
+            batch = self._live_entries(self._next_batch())
+            try:
+                if connection is None or not connection.is_open:
+                    connection, channel = self._connect()
+                if not batch:
+                    # Sem mensagens: manter os heartbeats da conexão em dia
+                    connection.process_data_events(time_limit=0)
+                    continue
+                self._publish_batch(channel, batch)
+                now = time.monotonic()
+                for _, future, _, queued_at, _ in batch:
+                    PUBLISH_LATENCY.observe(now - queued_at)
+                    future.set_result(True)
+            except Exception as e:
+                logger.warning(f"Erro no publicador RabbitMQ: {e}")
+                if connection is not None and connection.is_open:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                connection = channel = None
+                for body, future, attempts, queued_at, deadline in batch:
+                    if attempts + 1 < self.max_attempts:
+                        self._pending.put((body, future, attempts + 1, queued_at, deadline))
+                    else:
+                        PUBLISH_FAILURES.inc()
+                        future.set_exception(e)
+                time.sleep(0.5)
@@ -0,0 +1,129 @@
+"""
+Cache local da validação de tokens de sessão.
+
+Guarda o resultado de POST /validate do authentication_service numa LRU
+limitada, indexada pelo SHA-256 do token (o token em claro nunca fica em
+memória como chave). Opcionalmente (negative_ttl > 0) tokens inválidos
+também são guardados, com validade mais curta; só é seguro quando todas as
+réplicas do serviço de autenticação partilham as sessões.
+
+No logout o authentication_service grava o hash do token em
+`revoked_sessions`; um watcher lê essa coleção periodicamente e descarta
+as entradas correspondentes em todas as instâncias do catálogo.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from prometheus_client import Counter
+
+from db_mongodb import get_mongodb_manager
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_LOOKUPS = Counter('catalog_token_cache_lookups_total',
+                              'Consultas à cache de validação de tokens',
+                              ['result'])
+TOKEN_CACHE_REVOCATIONS = Counter('catalog_token_cache_revocations_total',
+                                  'Entradas descartadas por logout')
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class TokenCache:
+    """LRU com TTL de tokens validados (positivos e negativos)."""
+
+    def __init__(self, ttl=60.0, negative_ttl=0.0, max_entries=10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, token):
+        """Devolve (encontrado, user); user é None para tokens inválidos em cache."""
+        key = token_hash(token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                TOKEN_CACHE_LOOKUPS.labels(result='miss').inc()
+                return False, None
+            self._entries.move_to_end(key)
+        TOKEN_CACHE_LOOKUPS.labels(result='hit' if entry[0] else 'negative_hit').inc()
+        return True, entry[0]
+
+    def put(self, token, user):
+        ttl = self.ttl if user else self.negative_ttl
+        if ttl <= 0:
+            return
+        key = token_hash(token)
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_hash(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "negative_ttl_seconds": self.negative_ttl
+            }
+
+
+class RevocationWatcher:
+    """Aplica à cache os logouts gravados em `revoked_sessions`.
+
+    Cada leitura recua `overlap` segundos para apanhar revogações gravadas
+    fora de ordem por instâncias diferentes do serviço de autenticação;
+    descartar a mesma entrada duas vezes não tem efeito.
+    """
+
+    def __init__(self, cache, interval=1.0, overlap=5.0):
+        self.cache = cache
+        self.interval = interval
+        self.overlap = timedelta(seconds=overlap)
+        self._since = datetime.utcnow()
+
+    def start(self):
+        thread = threading.Thread(target=self._run, name='token-revocations')
+        thread.daemon = True
+        thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"Erro ao ler revogações de sessão: {e}")
+
+    def poll(self):
+        db = get_mongodb_manager().get_write_database()
+        revoked = db.revoked_sessions.find(
+            {'revoked_at': {'$gt': self._since - self.overlap}},
+            {'token_hash': 1, 'revoked_at': 1}
+        ).sort('revoked_at', 1)
+        for doc in revoked:
+            if self.cache.invalidate_hash(doc['token_hash']):
+                TOKEN_CACHE_REVOCATIONS.inc()
+            self._since = max(self._since, doc['revoked_at'])
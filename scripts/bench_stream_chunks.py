@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput do gerador de streaming vs tamanho de chunk.
+
+Lê os vídeos de exemplo em video_data/ através de streaming_service/chunking.py
+(o mesmo código usado no fallback do /stream) com vários tamanhos de chunk
+fixos e com a política adaptativa.
+
+Uso:
+    python scripts/bench_stream_chunks.py [--folder video_data] [--total-mb 512]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'streaming_service'))
+
+from chunking import read_chunks, STREAM_MAX_CHUNK_SIZE  # noqa: E402
+
+FIXED_SIZES = [1024, 4096, 16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+
+def run(files, total_bytes, initial, maximum, adaptive):
+    """Lê os arquivos em ciclo até `total_bytes`; devolve (bytes, segundos, iterações)."""
+    served = 0
+    iterations = 0
+    start = time.perf_counter()
+    while served < total_bytes:
+        for path, size in files:
+            with open(path, 'rb') as f:
+                for data in read_chunks(f, size, initial, maximum, adaptive):
+                    served += len(data)
+                    iterations += 1
+    return served, time.perf_counter() - start, iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--folder', default=os.path.join(ROOT, 'video_data'))
+    parser.add_argument('--total-mb', type=int, default=512)
+    args = parser.parse_args()
+
+    files = [
+        (os.path.join(args.folder, name), os.path.getsize(os.path.join(args.folder, name)))
+        for name in sorted(os.listdir(args.folder))
+        if name.lower().endswith(VIDEO_EXTENSIONS)
+    ]
+    if not files:
+        print(f"Nenhum vídeo encontrado em {args.folder}")
+        return 1
+
+    total_bytes = args.total_mb * 1024 * 1024
+    print(f"{len(files)} vídeo(s), {args.total_mb} MB por cenário")
+    print(f"{'chunk':>12} {'MB/s':>10} {'iterações':>12}")
+
+    scenarios = [(f"{size // 1024} KB", size, size, False) for size in FIXED_SIZES]
+    scenarios.append(("adaptativo", 64 * 1024, STREAM_MAX_CHUNK_SIZE, True))
+
+    for label, initial, maximum, adaptive in scenarios:
+        served, elapsed, iterations = run(files, total_bytes, initial, maximum, adaptive)
+        print(f"{label:>12} {served / (1024 * 1024) / elapsed:>10.1f} {iterations:>12}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
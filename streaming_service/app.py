@@ -3,8 +3,23 @@ from flask_cors import CORS
 from prometheus_flask_exporter import PrometheusMetrics
 import os
 import logging
+import json
 import mimetypes
+import stat as stat_module
+from datetime import datetime, timezone
+from werkzeug.exceptions import NotFound
+from werkzeug.http import http_date, quote_etag, is_resource_modified, parse_if_range_header
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from chunking import pread_chunks, STREAM_MAX_CHUNK_SIZE
+from byte_ranges import parse_range_header, multipart_layout, content_range
+from metadata_cache import VideoMetadataCache
+from video_index import VideoIndex
+from block_cache import BlockCache
+from stream_metrics import StreamMeter
+from rate_limit import RateLimiter, throttled
+from mp4_info import mp4_bitrate
+from readahead import ReadAhead
+from fd_pool import FileHandlePool
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -24,112 +39,371 @@ except Exception as e:
 VIDEO_FOLDER = '/videos'
 os.makedirs(VIDEO_FOLDER, exist_ok=True)
 
+# Transferência zero-copy via wsgi.file_wrapper (os.sendfile no gunicorn)
+SENDFILE_ENABLED = os.environ.get('STREAMING_SENDFILE', 'true').lower() == 'true'
+SENDFILE_BLOCK_SIZE = STREAM_MAX_CHUNK_SIZE
+
+# Cache de metadados dos vídeos (tamanho, mtime, MIME, ETag)
+METADATA_CACHE_SIZE = int(os.environ.get('STREAM_METADATA_CACHE_SIZE', 4096))
+METADATA_CACHE_TTL = float(os.environ.get('STREAM_METADATA_CACHE_TTL', 30))
+
+# Cache de blocos em memória para títulos quentes (0 = desativada)
+BLOCK_CACHE_MB = int(os.environ.get('STREAM_BLOCK_CACHE_MB', 0))
+BLOCK_CACHE_BLOCK_SIZE = int(os.environ.get('STREAM_BLOCK_SIZE', 1024 * 1024))
+BLOCK_CACHE_HOT_THRESHOLD = int(os.environ.get('STREAM_HOT_THRESHOLD', 3))
+
+# Limitação de débito (bytes/s; 0 = sem limite). Com STREAM_BITRATE_MULTIPLIER
+# o teto de cada stream acompanha o bitrate do título
+STREAM_MAX_RATE = int(os.environ.get('STREAM_MAX_RATE', 0))
+STREAM_GLOBAL_RATE = int(os.environ.get('STREAM_GLOBAL_RATE', 0))
+STREAM_BITRATE_MULTIPLIER = float(os.environ.get('STREAM_BITRATE_MULTIPLIER', 0))
+STREAM_RATE_BURST_SECONDS = float(os.environ.get('STREAM_RATE_BURST_SECONDS', 4))
+
+# Janela de read-ahead para pedidos Range sequenciais (0 = desativado)
+STREAM_READAHEAD_BYTES = int(os.environ.get('STREAM_READAHEAD_BYTES', 8 * 1024 * 1024))
+
+# Descriptors abertos partilhados entre pedidos (0 = abrir a cada pedido)
+STREAM_FD_POOL_SIZE = int(os.environ.get('STREAM_FD_POOL_SIZE', 256))
+
+# Renditions HLS/DASH geradas pelo video_processor em /videos/packaged/<filename>/
+PACKAGED_FOLDER = os.path.join(VIDEO_FOLDER, 'packaged')
+PACKAGED_SEGMENT_MAX_AGE = int(os.environ.get('STREAM_SEGMENT_MAX_AGE', 31536000))
+PACKAGED_MANIFEST_MAX_AGE = int(os.environ.get('STREAM_MANIFEST_MAX_AGE', 60))
+# Sprite + WebVTT de pré-visualização em /videos/previews/<filename>/
+PREVIEWS_FOLDER = os.path.join(VIDEO_FOLDER, 'previews')
+PREVIEW_MAX_AGE = int(os.environ.get('STREAM_PREVIEW_MAX_AGE', 86400))
+mimetypes.add_type('text/vtt', '.vtt')
+mimetypes.add_type('application/vnd.apple.mpegurl', '.m3u8')
+mimetypes.add_type('application/dash+xml', '.mpd')
+mimetypes.add_type('video/iso.segment', '.m4s')
+
+# Intervalo de atualização do índice incremental de /videos
+INDEX_REFRESH_INTERVAL = float(os.environ.get('STREAM_INDEX_INTERVAL', 5))
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "healthy", 
         "service": "streaming",
         "video_folder": VIDEO_FOLDER,
-        "videos_count": len([f for f in os.listdir(VIDEO_FOLDER) if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm'))])
+        "videos_count": video_index.video_count
     }), 200
 
+def file_validators(stat):
+    """ETag forte e Last-Modified derivados do os.stat do arquivo.
+
+    Usa apenas tamanho e mtime, para que todas as réplicas que partilham o
+    volume /videos produzam o mesmo validador.
+    """
+    etag = f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+    return etag, last_modified
+
+def validator_headers(etag, last_modified):
+    return {
+        'ETag': quote_etag(etag),
+        'Last-Modified': http_date(last_modified),
+    }
+
+def load_video_metadata(filename):
+    """Lê do disco os metadados de um vídeo; None se não existir."""
+    file_path = os.path.join(VIDEO_FOLDER, filename)
+    try:
+        stat = os.stat(file_path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not stat_module.S_ISREG(stat.st_mode):
+        return None
+    
+    mime_type, _ = mimetypes.guess_type(file_path)
+    etag, last_modified = file_validators(stat)
+    bitrate = None
+    if rate_limiter.bitrate_multiplier > 0:
+        bitrate = mp4_bitrate(file_path, stat.st_size)
+    return {
+        "path": file_path,
+        "size": stat.st_size,
+        "created": stat.st_ctime,
+        "modified": stat.st_mtime,
+        "mime_type": mime_type or 'video/mp4',
+        "etag": etag,
+        "last_modified": last_modified,
+        "bitrate": bitrate
+    }
+
+rate_limiter = RateLimiter(
+    max_stream_rate=STREAM_MAX_RATE,
+    global_rate=STREAM_GLOBAL_RATE,
+    bitrate_multiplier=STREAM_BITRATE_MULTIPLIER,
+    burst_seconds=STREAM_RATE_BURST_SECONDS
+)
+
+metadata_cache = VideoMetadataCache(
+    load_video_metadata,
+    max_entries=METADATA_CACHE_SIZE,
+    ttl=METADATA_CACHE_TTL
+)
+
+fd_pool = FileHandlePool(max_handles=STREAM_FD_POOL_SIZE)
+
+block_cache = BlockCache(
+    BLOCK_CACHE_MB * 1024 * 1024,
+    block_size=BLOCK_CACHE_BLOCK_SIZE,
+    hot_threshold=BLOCK_CACHE_HOT_THRESHOLD,
+    fd_pool=fd_pool
+)
+
+def invalidate_video(filename):
+    """Descarta o que está em cache para um arquivo alterado ou removido."""
+    metadata_cache.invalidate(filename)
+    block_cache.invalidate(filename)
+    fd_pool.invalidate(os.path.join(VIDEO_FOLDER, filename))
+
+# Índice incremental do diretório; alterações invalidam as caches
+video_index = VideoIndex(
+    VIDEO_FOLDER,
+    interval=INDEX_REFRESH_INTERVAL,
+    on_change=invalidate_video
+)
+try:
+    video_index.start()
+except Exception as e:
+    logger.error(f"Erro ao iniciar índice de vídeos: {e}")
+
+def not_modified_response(etag, last_modified):
+    """Resposta 304 se If-None-Match/If-Modified-Since indicarem cache válida."""
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return Response(status=304, headers=validator_headers(etag, last_modified))
+
+def if_range_matches(environ, etag, last_modified):
+    """Avalia If-Range: o Range só é honrado se o validador coincidir."""
+    header = environ.get('HTTP_IF_RANGE')
+    if not header:
+        return True
+    if header.strip().startswith('W/'):
+        # If-Range exige comparação forte
+        return False
+    if_range = parse_if_range_header(header)
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return if_range.date == last_modified
+    return False
+
+def plan_stream_response(metadata, environ):
+    """Decide a resposta do /stream a partir dos cabeçalhos do pedido.
+
+    Independente do servidor (WSGI ou ASGI): recebe um environ com os
+    cabeçalhos HTTP_* e devolve (status, headers, body), em que body é None,
+    ('range', start, length) ou ('multipart', parts, trailer).
+    """
+    file_size = metadata['size']
+    etag, last_modified = metadata['etag'], metadata['last_modified']
+    headers = {
+        'Accept-Ranges': 'bytes',
+        **validator_headers(etag, last_modified),
+    }
+    
+    if not is_resource_modified(environ, etag=etag, last_modified=last_modified):
+        return 304, headers, None
+    
+    # Verificar se é uma requisição Range (RFC 7233); If-Range que não
+    # coincide obriga a enviar o arquivo completo
+    ranges = None
+    if if_range_matches(environ, etag, last_modified):
+        ranges = parse_range_header(environ.get('HTTP_RANGE'), file_size)
+    
+    if ranges == []:
+        # Nenhum intervalo satisfazível
+        headers['Content-Range'] = f'bytes */{file_size}'
+        return 416, headers, None
+    
+    if ranges and len(ranges) == 1:
+        # Ler apenas o range solicitado (206 Partial Content)
+        byte_start, byte_end = ranges[0]
+        length = byte_end - byte_start + 1
+        headers['Content-Type'] = metadata['mime_type']
+        headers['Content-Range'] = content_range(byte_start, byte_end, file_size)
+        headers['Content-Length'] = str(length)
+        return 206, headers, ('range', byte_start, length)
+    
+    if ranges:
+        # Vários intervalos: resposta multipart/byteranges
+        boundary, parts, trailer, content_length = multipart_layout(ranges, file_size, metadata['mime_type'])
+        headers['Content-Type'] = f'multipart/byteranges; boundary={boundary}'
+        headers['Content-Length'] = str(content_length)
+        return 206, headers, ('multipart', parts, trailer)
+    
+    # Arquivo completo
+    headers['Content-Type'] = metadata['mime_type']
+    headers['Content-Length'] = str(file_size)
+    return 200, headers, ('range', 0, file_size)
+
+readahead = ReadAhead(STREAM_READAHEAD_BYTES, fd_pool=fd_pool)
+
+def client_id(environ):
+    """Identifica o cliente atrás do nginx (X-Real-IP / X-Forwarded-For)."""
+    forwarded = environ.get('HTTP_X_FORWARDED_FOR')
+    return (environ.get('HTTP_X_REAL_IP')
+            or (forwarded.split(',')[0].strip() if forwarded else None)
+            or environ.get('REMOTE_ADDR', 'unknown'))
+
+def schedule_readahead(metadata, filename, environ, body):
+    """Agenda read-ahead quando o cliente está a ler o título sequencialmente."""
+    if not readahead.enabled or body is None or body[0] != 'range' or 'HTTP_RANGE' not in environ:
+        return
+    _, byte_start, length = body
+    readahead.on_request(client_id(environ), filename, metadata['path'],
+                         byte_start, length, metadata['size'])
+
+def generate_file_range(file_path, etag, offset, remaining):
+    """Gerador em Python (fallback): pread sobre o descriptor partilhado do pool."""
+    with fd_pool.open(file_path, etag) as fd:
+        for data in pread_chunks(fd, offset, remaining):
+            yield data
+
+def video_range_body(metadata, filename, byte_start, length):
+    """Corpo da resposta: cache de blocos para títulos quentes, senão sendfile.
+
+    Streams sob limitação de débito usam sempre o gerador, porque o sendfile
+    não permite controlar o ritmo de envio.
+    """
+    throttle = rate_limiter.throttle(metadata.get('bitrate'))
+    if block_cache.enabled and block_cache.record_access(filename):
+        meter = StreamMeter(filename, 'cache', length)
+        body = block_cache.read(metadata['path'], filename, metadata['etag'], byte_start, length)
+    elif throttle is None:
+        return file_range_body(metadata, filename, byte_start, length)
+    else:
+        meter = StreamMeter(filename, 'throttled', length)
+        body = generate_file_range(metadata['path'], metadata['etag'], byte_start, length)
+    
+    if throttle is not None:
+        body = throttled(body, throttle)
+    return meter.wrap(body), False
+
+def file_range_body(metadata, filename, byte_start, length):
+    """Corpo da resposta para `length` bytes a partir de `byte_start`.
+
+    Quando o servidor WSGI disponibiliza `wsgi.file_wrapper` (gunicorn usa
+    os.sendfile, waitress envia a partir do buffer do arquivo), o arquivo é
+    entregue já posicionado em `byte_start` e o servidor limita a
+    transferência ao Content-Length. Este caminho abre o seu próprio arquivo:
+    o servidor mexe no offset do descriptor, que não pode ser partilhado.
+    Caso contrário usa o gerador em Python sobre o pool de descriptors.
+    """
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if SENDFILE_ENABLED and file_wrapper is not None:
+        f = open(metadata['path'], 'rb')
+        try:
+            f.seek(byte_start)
+            meter = StreamMeter(filename, 'sendfile', length)
+            return file_wrapper(meter.wrap_file(f, byte_start), SENDFILE_BLOCK_SIZE), True
+        except Exception:
+            f.close()
+            raise
+    meter = StreamMeter(filename, 'generator', length)
+    body = generate_file_range(metadata['path'], metadata['etag'], byte_start, length)
+    return meter.wrap(body), False
+
+def generate_multipart(file_path, etag, parts, trailer):
+    """Gera o corpo multipart/byteranges com um único descriptor do pool."""
+    with fd_pool.open(file_path, etag) as fd:
+        for header, start, end in parts:
+            yield header
+            for data in pread_chunks(fd, start, end - start + 1):
+                yield data
+        yield trailer
+
 @app.route('/stream/<filename>')
 def stream_video(filename):
     """Stream de vídeo com suporte a range requests."""
     try:
-        file_path = os.path.join(VIDEO_FOLDER, filename)
+        metadata = metadata_cache.get(filename)
         
-        if not os.path.exists(file_path):
+        if not metadata:
             logger.warning(f"Vídeo não encontrado: {filename}")
             return jsonify({"error": "Video not found"}), 404
         
-        def generate():
-            with open(file_path, 'rb') as f:
-                data = f.read(1024)
-                while data:
-                    yield data
-                    data = f.read(1024)
-        
-        # Detectar tipo MIME
-        mime_type, _ = mimetypes.guess_type(file_path)
-        if not mime_type:
-            mime_type = 'video/mp4'
-        
-        # Obter tamanho do arquivo
-        file_size = os.path.getsize(file_path)
-        
-        # Verificar se é uma requisição Range
-        range_header = request.headers.get('Range', None)
-        if range_header:
-            # Parse do header Range
-            byte_start = 0
-            byte_end = file_size - 1
-            
-            if range_header.startswith('bytes='):
-                byte_range = range_header[6:]
-                if '-' in byte_range:
-                    start, end = byte_range.split('-', 1)
-                    if start:
-                        byte_start = int(start)
-                    if end:
-                        byte_end = int(end)
-            
-            # Ler apenas o range solicitado
-            def generate_range():
-                with open(file_path, 'rb') as f:
-                    f.seek(byte_start)
-                    remaining = byte_end - byte_start + 1
-                    while remaining:
-                        chunk_size = min(1024, remaining)
-                        data = f.read(chunk_size)
-                        if not data:
-                            break
-                        yield data
-                        remaining -= len(data)
-            
-            # Retornar resposta 206 Partial Content
-            response = Response(
-                generate_range(),
-                206,
-                headers={
-                    'Content-Type': mime_type,
-                    'Accept-Ranges': 'bytes',
-                    'Content-Range': f'bytes {byte_start}-{byte_end}/{file_size}',
-                    'Content-Length': str(byte_end - byte_start + 1),
-                }
-            )
-            return response
-        else:
-            # Retornar arquivo completo
-            response = Response(
-                generate(),
-                200,
-                headers={
-                    'Content-Type': mime_type,
-                    'Accept-Ranges': 'bytes',
-                    'Content-Length': str(file_size),
-                }
-            )
-            return response
+        status, headers, body = plan_stream_response(metadata, request.environ)
+        
+        if body is None or request.method == 'HEAD':
+            return Response(status=status, headers=headers)
+        
+        schedule_readahead(metadata, filename, request.environ, body)
+        
+        if body[0] == 'multipart':
+            _, parts, trailer = body
+            meter = StreamMeter(filename, 'multipart', int(headers['Content-Length']))
+            body = generate_multipart(metadata['path'], metadata['etag'], parts, trailer)
+            throttle = rate_limiter.throttle(metadata.get('bitrate'))
+            if throttle is not None:
+                body = throttled(body, throttle)
+            return Response(meter.wrap(body), status, headers=headers)
+        
+        _, byte_start, length = body
+        body, passthrough = video_range_body(metadata, filename, byte_start, length)
+        return Response(body, status, headers=headers, direct_passthrough=passthrough)
             
+    except FileNotFoundError:
+        # Arquivo removido desde que os metadados foram guardados em cache
+        invalidate_video(filename)
+        logger.warning(f"Vídeo não encontrado: {filename}")
+        return jsonify({"error": "Video not found"}), 404
     except Exception as e:
         logger.error(f"Erro ao fazer stream do vídeo {filename}: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+def send_derived_asset(folder, filename, asset, max_age, immutable):
+    """Serve um arquivo derivado do vídeo (pacote HLS/DASH, pré-visualizações)."""
+    try:
+        response = send_from_directory(folder, f"{filename}/{asset}", max_age=max_age)
+        response.cache_control.public = True
+        if immutable:
+            response.cache_control.immutable = True
+        return response
+    except NotFound:
+        return jsonify({"error": "Asset not found"}), 404
+    except Exception as e:
+        logger.error(f"Erro ao servir {asset} do vídeo {filename}: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/stream/<filename>/<path:asset>')
+def stream_packaged_asset(filename, asset):
+    """Manifests e segmentos HLS/DASH de um vídeo empacotado.
+
+    Os segmentos nunca mudam depois de escritos e são servidos com uma
+    validade longa (immutable); os manifests usam uma validade curta.
+    """
+    if asset.endswith(('.m3u8', '.mpd')):
+        return send_derived_asset(PACKAGED_FOLDER, filename, asset, PACKAGED_MANIFEST_MAX_AGE, False)
+    return send_derived_asset(PACKAGED_FOLDER, filename, asset, PACKAGED_SEGMENT_MAX_AGE, True)
+
+@app.route('/stream/<filename>/preview/<asset>')
+def stream_preview_asset(filename, asset):
+    """Sprite sheet e faixa WebVTT de pré-visualização da barra de seek."""
+    return send_derived_asset(PREVIEWS_FOLDER, filename, asset, PREVIEW_MAX_AGE, False)
+
 @app.route('/download/<filename>')
 def download_video(filename):
     """Download direto do vídeo."""
     try:
-        file_path = os.path.join(VIDEO_FOLDER, filename)
+        metadata = metadata_cache.get(filename)
         
-        if not os.path.exists(file_path):
+        if not metadata:
             return jsonify({"error": "Video not found"}), 404
+        
+        # send_from_directory trata 304/If-Range com os mesmos validadores do /stream
+        etag, last_modified = metadata['etag'], metadata['last_modified']
             
         return send_from_directory(
             VIDEO_FOLDER, 
             filename, 
             as_attachment=True,
-            download_name=filename
+            download_name=filename,
+            etag=etag,
+            last_modified=last_modified
         )
     except Exception as e:
         logger.error(f"Erro ao baixar vídeo {filename}: {e}")
@@ -139,49 +413,102 @@ def download_video(filename):
 def video_info(filename):
     """Informações sobre o vídeo."""
     try:
-        file_path = os.path.join(VIDEO_FOLDER, filename)
+        metadata = metadata_cache.get(filename)
         
-        if not os.path.exists(file_path):
+        if not metadata:
             return jsonify({"error": "Video not found"}), 404
         
-        stat = os.stat(file_path)
-        mime_type, _ = mimetypes.guess_type(file_path)
+        etag, last_modified = metadata['etag'], metadata['last_modified']
+        
+        not_modified = not_modified_response(etag, last_modified)
+        if not_modified:
+            return not_modified
         
         info = {
             "filename": filename,
-            "size": stat.st_size,
-            "size_mb": round(stat.st_size / (1024 * 1024), 2),
-            "mime_type": mime_type or "video/mp4",
-            "created": stat.st_ctime,
-            "modified": stat.st_mtime
+            "size": metadata['size'],
+            "size_mb": round(metadata['size'] / (1024 * 1024), 2),
+            "mime_type": metadata['mime_type'],
+            "created": metadata['created'],
+            "modified": metadata['modified']
         }
         
-        return jsonify(info)
+        response = jsonify(info)
+        response.headers.update(validator_headers(etag, last_modified))
+        return response
         
     except Exception as e:
         logger.error(f"Erro ao obter info do vídeo {filename}: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+# Tamanho máximo de página aceite em /list?limit=
+LIST_MAX_LIMIT = int(os.environ.get('STREAM_LIST_MAX_LIMIT', 1000))
+
+def video_list_entry(filename, size):
+    return {
+        "filename": filename,
+        "size": size,
+        "size_mb": round(size / (1024 * 1024), 2),
+        "url": f"/stream/{filename}"
+    }
+
+def generate_video_list_json(after, limit):
+    """Encoder JSON em streaming: emite um vídeo de cada vez a partir do índice."""
+    yield '{"count": %d, "videos": [' % video_index.video_count
+    
+    sent = 0
+    last = None
+    for filename, size, _ in video_index.iter_videos(after):
+        if limit is not None and sent == limit:
+            break
+        yield (',' if sent else '') + json.dumps(video_list_entry(filename, size))
+        sent += 1
+        last = filename
+    
+    if limit is None:
+        yield ']}'
+    else:
+        # Só há página seguinte se existir algum vídeo depois do último enviado
+        has_more = sent == limit and video_index.videos_page(last, 1)[0]
+        yield '], "next": %s}' % json.dumps(last if has_more else None)
+
 @app.route('/list')
 def list_available_videos():
-    """Lista vídeos disponíveis no storage."""
+    """Lista vídeos disponíveis no storage.
+    
+    Parâmetros opcionais: `limit` e `after` (cursor = último filename
+    recebido) para paginação, e `stream=true` para emitir o JSON em streaming.
+    """
     try:
-        videos = []
-        for filename in os.listdir(VIDEO_FOLDER):
-            if filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
-                file_path = os.path.join(VIDEO_FOLDER, filename)
-                stat = os.stat(file_path)
-                videos.append({
-                    "filename": filename,
-                    "size": stat.st_size,
-                    "size_mb": round(stat.st_size / (1024 * 1024), 2),
-                    "url": f"/stream/{filename}"
-                })
-        
-        return jsonify({
-            "count": len(videos),
+        after = request.args.get('after') or None
+        limit = request.args.get('limit')
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                return jsonify({"error": "limit must be an integer"}), 400
+            if limit < 1:
+                return jsonify({"error": "limit must be positive"}), 400
+            limit = min(limit, LIST_MAX_LIMIT)
+        
+        if request.args.get('stream', 'false').lower() == 'true':
+            return Response(
+                generate_video_list_json(after, limit),
+                200,
+                mimetype='application/json'
+            )
+        
+        page, next_cursor = video_index.videos_page(after, limit)
+        videos = [video_list_entry(filename, size) for filename, size, _ in page]
+        
+        result = {
+            "count": video_index.video_count,
             "videos": videos
-        })
+        }
+        if limit is not None:
+            result["next"] = next_cursor
+        
+        return jsonify(result)
         
     except Exception as e:
         logger.error(f"Erro ao listar vídeos: {e}")
@@ -191,11 +518,8 @@ def list_available_videos():
 def status_endpoint():
     """Endpoint para informações do serviço."""
     try:
-        video_count = len([f for f in os.listdir(VIDEO_FOLDER) 
-                          if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm'))])
-        
-        total_size = sum(os.path.getsize(os.path.join(VIDEO_FOLDER, f)) 
-                        for f in os.listdir(VIDEO_FOLDER) if os.path.isfile(os.path.join(VIDEO_FOLDER, f)))
+        video_count = video_index.video_count
+        total_size = video_index.total_bytes
         
         status_data = {
             "service": "streaming",
@@ -203,7 +527,13 @@ def status_endpoint():
             "video_count": video_count,
             "total_size_bytes": total_size,
             "total_size_gb": round(total_size / (1024 * 1024 * 1024), 2),
-            "storage_path": VIDEO_FOLDER
+            "storage_path": VIDEO_FOLDER,
+            "metadata_cache": metadata_cache.stats(),
+            "index": video_index.stats(),
+            "block_cache": block_cache.stats(),
+            "rate_limit": rate_limiter.stats(),
+            "readahead": readahead.stats(),
+            "fd_pool": fd_pool.stats()
         }
         
         return jsonify(status_data)
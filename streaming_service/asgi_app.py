@@ -0,0 +1,227 @@
+"""
+Modo de serviço assíncrono (ASGI) do Streaming Service.
+
+O /stream/<filename> é servido nativamente em asyncio: as leituras do disco
+(os.pread) correm num executor e não bloqueiam o event loop, e cada chunk só
+é lido depois de o anterior ter sido aceite pelo transporte (`await send`
+respeita o controlo de fluxo do servidor), pelo que clientes lentos não
+acumulam dados em memória nem prendem uma thread. As restantes rotas são
+delegadas à app Flask através de asgiref.
+
+Uso:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8001
+"""
+
+import asyncio
+import json
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (app as flask_app, logger, metadata_cache, block_cache, rate_limiter, fd_pool,
+                 plan_stream_response, schedule_readahead, invalidate_video)
+from chunking import chunk_sizes
+from stream_metrics import StreamMeter
+
+STREAM_PREFIX = '/stream/'
+
+flask_asgi = WsgiToAsgi(flask_app)
+
+
+def scope_environ(scope):
+    """Converte os cabeçalhos ASGI nas chaves HTTP_* de um environ WSGI."""
+    environ = {'REQUEST_METHOD': scope['method']}
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        key = 'HTTP_' + name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin-1'), str(value).encode('latin-1'))
+            for name, value in headers.items()]
+
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': encode_headers({
+            'Content-Type': 'application/json',
+            'Content-Length': len(body),
+            'Access-Control-Allow-Origin': '*',
+        }),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def read_file_range(file_path, etag, start, length):
+    """Lê `length` bytes a partir de `start` com pread num executor."""
+    loop = asyncio.get_running_loop()
+    handle = await loop.run_in_executor(None, fd_pool.acquire, file_path, etag)
+    try:
+        sizes = chunk_sizes(length)
+        for size in sizes:
+            data = await loop.run_in_executor(None, os.pread, handle.fd, size, start)
+            if not data:
+                break
+            yield data
+            start += len(data)
+    finally:
+        fd_pool.release(handle)
+
+
+async def read_cached_range(metadata, filename, start, length):
+    """Itera o gerador da cache de blocos sem bloquear o event loop."""
+    loop = asyncio.get_running_loop()
+    blocks = block_cache.read(metadata['path'], filename, metadata['etag'], start, length)
+    try:
+        while True:
+            data = await loop.run_in_executor(None, next, blocks, None)
+            if data is None:
+                break
+            yield data
+    finally:
+        blocks.close()
+
+
+async def throttled_async(chunks, throttle):
+    """Versão assíncrona do limitador de débito: espera com asyncio.sleep."""
+    with throttle:
+        async for data in chunks:
+            for piece in throttle.slices(data):
+                wait = throttle.reserve(len(piece))
+                if wait:
+                    await asyncio.sleep(wait)
+                yield piece
+
+
+async def iter_stream_body(metadata, filename, body):
+    throttle = rate_limiter.throttle(metadata.get('bitrate'))
+    chunks = iter_unthrottled_body(metadata, filename, body)
+    if throttle is not None:
+        chunks = throttled_async(chunks, throttle)
+    try:
+        async for data in chunks:
+            yield data
+    finally:
+        await chunks.aclose()
+
+
+async def iter_unthrottled_body(metadata, filename, body):
+    if body[0] == 'multipart':
+        _, parts, trailer = body
+        for header, start, end in parts:
+            yield header
+            async for data in read_file_range(metadata['path'], metadata['etag'], start, end - start + 1):
+                yield data
+        yield trailer
+        return
+
+    _, start, length = body
+    if block_cache.enabled and block_cache.record_access(filename):
+        chunks = read_cached_range(metadata, filename, start, length)
+    else:
+        chunks = read_file_range(metadata['path'], metadata['etag'], start, length)
+    async for data in chunks:
+        yield data
+
+
+async def watch_disconnect(receive, disconnected):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            disconnected.set()
+            return
+
+
+async def stream_video(scope, receive, send):
+    """Versão assíncrona do /stream/<filename>."""
+    filename = scope['path'][len(STREAM_PREFIX):]
+    loop = asyncio.get_running_loop()
+
+    metadata = await loop.run_in_executor(None, metadata_cache.get, filename)
+    if not metadata:
+        logger.warning(f"Vídeo não encontrado: {filename}")
+        await send_json(send, 404, {"error": "Video not found"})
+        return
+
+    environ = scope_environ(scope)
+    status, headers, body = plan_stream_response(metadata, environ)
+    headers['Access-Control-Allow-Origin'] = '*'
+
+    if body is None or scope['method'] == 'HEAD':
+        await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    schedule_readahead(metadata, filename, environ, body)
+    chunks = iter_stream_body(metadata, filename, body)
+    try:
+        # Ler o primeiro chunk antes de enviar cabeçalhos permite responder
+        # 404 se o arquivo tiver sido removido entretanto
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b''
+    except FileNotFoundError:
+        invalidate_video(filename)
+        logger.warning(f"Vídeo não encontrado: {filename}")
+        await send_json(send, 404, {"error": "Video not found"})
+        return
+
+    await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+
+    meter = StreamMeter(filename, 'asgi', int(headers['Content-Length']))
+    meter.begin()
+    disconnected = asyncio.Event()
+    watcher = asyncio.create_task(watch_disconnect(receive, disconnected))
+    try:
+        meter.first_byte()
+        await send({'type': 'http.response.body', 'body': first, 'more_body': True})
+        meter.add(len(first))
+        async for data in chunks:
+            if disconnected.is_set():
+                break
+            await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+            meter.add(len(data))
+        if not disconnected.is_set():
+            await send({'type': 'http.response.body', 'body': b''})
+    except Exception as e:
+        logger.error(f"Erro ao fazer stream do vídeo {filename}: {e}")
+    finally:
+        watcher.cancel()
+        await chunks.aclose()
+        meter.finish()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+
+    path = scope.get('path', '')
+    if (scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD')
+            and path.startswith(STREAM_PREFIX) and '/' not in path[len(STREAM_PREFIX):]
+            and len(path) > len(STREAM_PREFIX)):
+        try:
+            await stream_video(scope, receive, send)
+        except Exception as e:
+            logger.error(f"Erro ao fazer stream do vídeo {path}: {e}")
+            await send_json(send, 500, {"error": "Internal server error"})
+        return
+
+    await flask_asgi(scope, receive, send)
@@ -0,0 +1,145 @@
+"""
+Cache em memória de blocos alinhados dos títulos mais populares.
+
+Quando um título é pedido várias vezes numa janela curta passa a ser
+considerado "quente" e os seus pedidos passam a ser servidos a partir de uma
+LRU de blocos de tamanho fixo, limitada por um orçamento de memória. Os
+blocos são identificados por (filename, etag, índice), pelo que um arquivo
+substituído nunca devolve dados antigos.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter, Gauge
+
+from fd_pool import FileHandlePool
+
+BLOCK_CACHE_HITS = Counter('streaming_block_cache_hits_total',
+                           'Blocos servidos a partir da cache em memória')
+BLOCK_CACHE_MISSES = Counter('streaming_block_cache_misses_total',
+                             'Blocos lidos do disco por falha na cache')
+BLOCK_CACHE_EVICTIONS = Counter('streaming_block_cache_evictions_total',
+                                'Blocos removidos da cache por falta de orçamento')
+BLOCK_CACHE_BYTES = Gauge('streaming_block_cache_bytes',
+                          'Bytes ocupados pela cache de blocos')
+BLOCK_CACHE_BUDGET = Gauge('streaming_block_cache_budget_bytes',
+                           'Orçamento de memória da cache de blocos')
+
+
+class BlockCache:
+    """LRU de blocos alinhados com orçamento em bytes."""
+
+    def __init__(self, budget_bytes, block_size=1024 * 1024, hot_threshold=3, hot_window=60.0,
+                 fd_pool=None):
+        self.budget_bytes = budget_bytes
+        self.block_size = block_size
+        self.hot_threshold = hot_threshold
+        self.hot_window = hot_window
+        self.fd_pool = fd_pool or FileHandlePool(max_handles=0)
+        self._blocks = OrderedDict()
+        self._bytes = 0
+        self._popularity = {}
+        self._lock = threading.Lock()
+        BLOCK_CACHE_BUDGET.set(budget_bytes)
+
+    @property
+    def enabled(self):
+        return self.budget_bytes > 0
+
+    def record_access(self, filename):
+        """Regista um pedido ao título e indica se ele está quente."""
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            window_start, count = self._popularity.get(filename, (now, 0))
+            if now - window_start > self.hot_window:
+                window_start, count = now, 0
+            count += 1
+            self._popularity[filename] = (window_start, count)
+            if len(self._popularity) > 10000:
+                self._prune_popularity(now)
+        return count >= self.hot_threshold
+
+    def _prune_popularity(self, now):
+        expired = [name for name, (start, _) in self._popularity.items()
+                   if now - start > self.hot_window]
+        for name in expired:
+            del self._popularity[name]
+
+    def read(self, file_path, filename, etag, offset, length):
+        """Gera `length` bytes a partir de `offset`, bloco a bloco, via cache."""
+        handle = None
+        try:
+            end = offset + length
+            while offset < end:
+                index = offset // self.block_size
+                block = self._lookup((filename, etag, index))
+                if block is None:
+                    if handle is None:
+                        handle = self.fd_pool.acquire(file_path, etag)
+                    block = os.pread(handle.fd, self.block_size, index * self.block_size)
+                    if not block:
+                        break
+                    self._store((filename, etag, index), block)
+
+                block_offset = offset - index * self.block_size
+                chunk_end = min(len(block), block_offset + end - offset)
+                if block_offset >= chunk_end:
+                    break
+                if block_offset == 0 and chunk_end == len(block):
+                    yield block
+                else:
+                    yield block[block_offset:chunk_end]
+                offset += chunk_end - block_offset
+        finally:
+            if handle is not None:
+                self.fd_pool.release(handle)
+
+    def _lookup(self, key):
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+        if block is None:
+            BLOCK_CACHE_MISSES.inc()
+        else:
+            BLOCK_CACHE_HITS.inc()
+        return block
+
+    def _store(self, key, block):
+        if len(block) > self.budget_bytes:
+            return
+        with self._lock:
+            previous = self._blocks.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._blocks[key] = block
+            self._bytes += len(block)
+            while self._bytes > self.budget_bytes:
+                _, evicted = self._blocks.popitem(last=False)
+                self._bytes -= len(evicted)
+                BLOCK_CACHE_EVICTIONS.inc()
+            BLOCK_CACHE_BYTES.set(self._bytes)
+
+    def invalidate(self, filename):
+        """Remove todos os blocos de um arquivo."""
+        with self._lock:
+            for key in [key for key in self._blocks if key[0] == filename]:
+                self._bytes -= len(self._blocks.pop(key))
+            BLOCK_CACHE_BYTES.set(self._bytes)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "blocks": len(self._blocks),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget_bytes,
+                "block_size": self.block_size,
+                "hot_titles": sum(1 for _, count in self._popularity.values()
+                                  if count >= self.hot_threshold)
+            }
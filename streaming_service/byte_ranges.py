@@ -0,0 +1,100 @@
+"""
+Parsing de cabeçalhos Range (RFC 7233) e layout de respostas
+multipart/byteranges para o streaming de vídeo.
+"""
+
+import uuid
+
+# Acima deste número de intervalos (após fusão) o Range é ignorado e o
+# arquivo é servido completo, para evitar respostas multipart abusivas.
+MAX_RANGES = 16
+
+
+def parse_range_header(header, file_size):
+    """Interpreta um cabeçalho Range para um arquivo de `file_size` bytes.
+
+    Devolve None quando o cabeçalho deve ser ignorado (ausente, unidade
+    desconhecida ou sintaxe inválida), uma lista vazia quando nenhum intervalo
+    é satisfazível (416), ou a lista ordenada de intervalos (start, end)
+    inclusivos, já limitados ao tamanho do arquivo e fundidos.
+    """
+    if not header:
+        return None
+
+    unit, sep, spec = header.partition('=')
+    if not sep or unit.strip().lower() != 'bytes':
+        return None
+
+    ranges = []
+    specs = [part.strip() for part in spec.split(',') if part.strip()]
+    if not specs:
+        return None
+
+    for part in specs:
+        first, dash, last = part.partition('-')
+        first, last = first.strip(), last.strip()
+        if not dash:
+            return None
+
+        if not first:
+            # Suffix range: bytes=-N (últimos N bytes)
+            if not last.isdigit():
+                return None
+            suffix = int(last)
+            if suffix == 0 or file_size == 0:
+                continue
+            ranges.append((max(file_size - suffix, 0), file_size - 1))
+            continue
+
+        if not first.isdigit() or (last and not last.isdigit()):
+            return None
+        start = int(first)
+        end = int(last) if last else file_size - 1
+        if last and end < start:
+            return None
+        if start >= file_size:
+            continue
+        ranges.append((start, min(end, file_size - 1)))
+
+    ranges = coalesce_ranges(ranges)
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def coalesce_ranges(ranges):
+    """Ordena e funde intervalos sobrepostos ou contíguos."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def content_range(start, end, file_size):
+    return f'bytes {start}-{end}/{file_size}'
+
+
+def multipart_layout(ranges, file_size, content_type, boundary=None):
+    """Calcula as partes de uma resposta multipart/byteranges.
+
+    Devolve (boundary, parts, trailer, content_length), onde `parts` é uma
+    lista de (cabeçalho_da_parte, start, end) e `trailer` fecha o corpo.
+    """
+    boundary = boundary or uuid.uuid4().hex
+    parts = []
+    content_length = 0
+    for start, end in ranges:
+        header = (
+            f'\r\n--{boundary}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Range: {content_range(start, end, file_size)}\r\n'
+            f'\r\n'
+        ).encode('latin-1')
+        parts.append((header, start, end))
+        content_length += len(header) + end - start + 1
+    trailer = f'\r\n--{boundary}--\r\n'.encode('latin-1')
+    content_length += len(trailer)
+    return boundary, parts, trailer, content_length
@@ -0,0 +1,64 @@
+"""
+Política de tamanho de chunk para o streaming de vídeo.
+
+Começa com um chunk configurável e, em leituras sequenciais longas, duplica o
+tamanho a cada leitura até ao máximo configurado. Pedidos pequenos (ex.:
+players a sondar o moov atom) continuam a usar chunks pequenos.
+"""
+
+import os
+
+# Tamanho inicial do chunk (bytes)
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 64 * 1024))
+
+# Tamanho máximo atingido pelo crescimento adaptativo (bytes)
+STREAM_MAX_CHUNK_SIZE = int(os.environ.get('STREAM_MAX_CHUNK_SIZE', 4 * 1024 * 1024))
+
+# Crescimento adaptativo ligado por omissão
+STREAM_ADAPTIVE_CHUNKS = os.environ.get('STREAM_ADAPTIVE_CHUNKS', 'true').lower() == 'true'
+
+
+def chunk_sizes(remaining, initial=None, maximum=None, adaptive=None):
+    """Gera os tamanhos de leitura para transferir `remaining` bytes."""
+    size = initial or STREAM_CHUNK_SIZE
+    maximum = max(maximum or STREAM_MAX_CHUNK_SIZE, size)
+    if adaptive is None:
+        adaptive = STREAM_ADAPTIVE_CHUNKS
+
+    while remaining > 0:
+        chunk = min(size, remaining)
+        sent = yield chunk
+        remaining -= chunk if sent is None else sent
+        if adaptive and size < maximum:
+            size = min(size * 2, maximum)
+
+
+def read_chunks(f, remaining, initial=None, maximum=None, adaptive=None):
+    """Lê até `remaining` bytes do arquivo aberto segundo a política de chunks."""
+    sizes = chunk_sizes(remaining, initial, maximum, adaptive)
+    try:
+        chunk_size = next(sizes)
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            yield data
+            chunk_size = sizes.send(len(data))
+    except StopIteration:
+        pass
+
+
+def pread_chunks(fd, offset, remaining, initial=None, maximum=None, adaptive=None):
+    """Como read_chunks, mas com leituras posicionais (os.pread) num fd partilhado."""
+    sizes = chunk_sizes(remaining, initial, maximum, adaptive)
+    try:
+        chunk_size = next(sizes)
+        while True:
+            data = os.pread(fd, chunk_size, offset)
+            if not data:
+                break
+            yield data
+            offset += len(data)
+            chunk_size = sizes.send(len(data))
+    except StopIteration:
+        pass
@@ -0,0 +1,140 @@
+"""
+Pool de file descriptors partilhados entre pedidos ao mesmo vídeo.
+
+Cada arquivo é aberto uma vez e o descriptor é partilhado com contagem de
+referências; as leituras usam os.pread (posicionais), por isso pedidos
+concorrentes não interferem entre si. Descriptors sem referências ficam
+abertos até serem expulsos por LRU. Quando o ETag do arquivo muda (arquivo
+substituído) ou o índice reporta alteração, a entrada é retirada e o
+descriptor antigo é fechado assim que deixar de estar em uso.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge
+
+FD_POOL_OPENS = Counter('streaming_fd_pool_opens_total',
+                        'Arquivos abertos pelo pool de descriptors')
+FD_POOL_REUSES = Counter('streaming_fd_pool_reuses_total',
+                         'Pedidos servidos com um descriptor já aberto')
+FD_POOL_OPEN = Gauge('streaming_fd_pool_open_descriptors',
+                     'Descriptors abertos no pool')
+
+
+class FileHandle:
+    __slots__ = ('path', 'etag', 'fd', 'refs', 'retired')
+
+    def __init__(self, path, etag, fd):
+        self.path = path
+        self.etag = etag
+        self.fd = fd
+        self.refs = 0
+        self.retired = False
+
+
+class FileHandlePool:
+    """Pool limitado de descriptors só-de-leitura, com contagem de referências."""
+
+    def __init__(self, max_handles=256):
+        self.max_handles = max_handles
+        self._handles = OrderedDict()
+        self._open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, path, etag=None):
+        with self._lock:
+            handle = self._current(path, etag)
+            if handle is not None:
+                handle.refs += 1
+                FD_POOL_REUSES.inc()
+                return handle
+
+        fd = os.open(path, os.O_RDONLY)
+
+        with self._lock:
+            handle = self._current(path, etag)
+            if handle is not None:
+                # Outro pedido abriu o mesmo arquivo entretanto
+                os.close(fd)
+                handle.refs += 1
+                FD_POOL_REUSES.inc()
+                return handle
+            handle = FileHandle(path, etag, fd)
+            handle.refs = 1
+            self._handles[path] = handle
+            self._open += 1
+            FD_POOL_OPENS.inc()
+            self._evict()
+            FD_POOL_OPEN.set(self._open)
+            return handle
+
+    def release(self, handle):
+        with self._lock:
+            handle.refs -= 1
+            if handle.refs == 0 and handle.retired:
+                self._close(handle)
+            self._evict()
+            FD_POOL_OPEN.set(self._open)
+
+    @contextmanager
+    def open(self, path, etag=None):
+        """Empresta o descriptor de `path` durante o bloco `with`."""
+        handle = self.acquire(path, etag)
+        try:
+            yield handle.fd
+        finally:
+            self.release(handle)
+
+    def invalidate(self, path):
+        """Retira a entrada de um arquivo alterado ou removido."""
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is not None:
+                self._retire(handle)
+            FD_POOL_OPEN.set(self._open)
+
+    def _current(self, path, etag):
+        handle = self._handles.get(path)
+        if handle is None:
+            return None
+        if etag is not None and handle.etag != etag:
+            self._retire(handle)
+            return None
+        self._handles.move_to_end(path)
+        return handle
+
+    def _retire(self, handle):
+        if self._handles.get(handle.path) is handle:
+            del self._handles[handle.path]
+        handle.retired = True
+        if handle.refs == 0:
+            self._close(handle)
+
+    def _close(self, handle):
+        if handle.fd is not None:
+            os.close(handle.fd)
+            handle.fd = None
+            self._open -= 1
+
+    def _evict(self):
+        # Expulsa descriptors inativos (LRU) acima do limite
+        if len(self._handles) <= self.max_handles:
+            return
+        for path in list(self._handles):
+            if len(self._handles) <= self.max_handles:
+                break
+            handle = self._handles[path]
+            if handle.refs == 0:
+                self._retire(handle)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_handles": self.max_handles,
+                "cached": len(self._handles),
+                "open": self._open,
+                "in_use": sum(1 for handle in self._handles.values() if handle.refs)
+            }
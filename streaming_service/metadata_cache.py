@@ -0,0 +1,71 @@
+"""
+Cache em memória de metadados dos vídeos (tamanho, mtime, MIME, ETag).
+
+Evita os.stat / os.path.exists / mimetypes em cada pedido a /stream, /info e
+/download quando /videos está em storage de rede. As entradas expiram após
+um TTL e a cache é limitada a um número máximo de entradas (LRU).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class VideoMetadataCache:
+    """Cache LRU limitada, com TTL, de metadados por nome de arquivo."""
+
+    def __init__(self, loader, max_entries=1024, ttl=30.0):
+        # loader(filename) devolve o dicionário de metadados ou None se o
+        # arquivo não existir; ausências não são guardadas em cache
+        self.loader = loader
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, filename):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(filename)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        metadata = self.loader(filename)
+
+        with self._lock:
+            if metadata is None:
+                self._entries.pop(filename, None)
+                return None
+            self._entries[filename] = (now + self.ttl, metadata)
+            self._entries.move_to_end(filename)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return metadata
+
+    def invalidate(self, filename=None):
+        """Remove uma entrada (ou todas, se `filename` for None)."""
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(filename, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0
+            }
@@ -0,0 +1,68 @@
+"""
+Leitura mínima de metadados de arquivos MP4/MOV (duração e bitrate).
+
+Percorre apenas os cabeçalhos das boxes de topo até ao `moov` e lê o `mvhd`,
+sem depender de ffprobe: são poucas leituras pequenas mesmo quando o moov
+está no fim do arquivo.
+"""
+
+import os
+import struct
+
+MP4_EXTENSIONS = ('.mp4', '.m4v', '.mov')
+
+
+def iter_boxes(f, start, end):
+    """Gera (tipo, offset_do_conteúdo, fim) das boxes entre start e end."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        content = offset + 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            content += 8
+        elif size == 0:
+            size = end - offset
+        if size < content - offset:
+            return
+        yield box_type, content, offset + size
+        offset += size
+
+
+def mp4_duration(file_path):
+    """Duração em segundos a partir do moov/mvhd; None se não for possível."""
+    if not file_path.lower().endswith(MP4_EXTENSIONS):
+        return None
+    try:
+        with open(file_path, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            for box_type, content, box_end in iter_boxes(f, 0, file_size):
+                if box_type != b'moov':
+                    continue
+                for child_type, child, _ in iter_boxes(f, content, box_end):
+                    if child_type != b'mvhd':
+                        continue
+                    f.seek(child)
+                    version = f.read(1)[0]
+                    if version == 1:
+                        f.seek(child + 4 + 16)
+                        timescale, duration = struct.unpack('>IQ', f.read(12))
+                    else:
+                        f.seek(child + 4 + 8)
+                        timescale, duration = struct.unpack('>II', f.read(8))
+                    return duration / timescale if timescale else None
+    except (OSError, struct.error, IndexError):
+        return None
+    return None
+
+
+def mp4_bitrate(file_path, file_size):
+    """Bitrate médio em bytes/s, ou None se a duração for desconhecida."""
+    duration = mp4_duration(file_path)
+    if not duration:
+        return None
+    return file_size / duration
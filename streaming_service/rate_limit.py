@@ -0,0 +1,207 @@
+"""
+Limitação de débito por stream (token bucket) e partilha justa do débito
+global da réplica entre os streams ativos (max-min fairness).
+
+Cada stream recebe um teto próprio, fixo ou proporcional ao bitrate do
+título, e o scheduler global reparte o débito total: streams com teto abaixo
+da quota justa ficam com o seu teto e a sobra é dividida pelos restantes.
+"""
+
+import threading
+import time
+
+from prometheus_client import Counter, Gauge
+
+THROTTLE_WAIT_SECONDS = Counter('streaming_throttle_wait_seconds_total',
+                                'Tempo total de espera imposto pelo limitador de débito')
+THROTTLED_STREAMS = Gauge('streaming_throttled_streams',
+                          'Streams ativos sob limitação de débito')
+
+# Fatia máxima enviada de cada vez, em segundos de débito, para que chunks
+# grandes não sejam entregues em rajadas
+SLICE_SECONDS = 0.1
+MIN_SLICE_BYTES = 16 * 1024
+
+
+class TokenBucket:
+    """Token bucket em bytes; permite dívida, que se traduz em espera.
+
+    A capacidade é sempre `burst_seconds` de débito ao rate atual, pelo que
+    baixar o rate também encolhe a rajada disponível.
+    """
+
+    def __init__(self, rate, burst_seconds):
+        self.rate = rate
+        self.burst_seconds = burst_seconds
+        self.capacity = rate * burst_seconds if burst_seconds else 0.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill()
+            self.rate = rate
+            self.capacity = rate * self.burst_seconds if self.burst_seconds else 0.0
+            self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate != float('inf'):
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Consome `amount` bytes e devolve os segundos a esperar antes de enviar."""
+        with self._lock:
+            if self.rate == float('inf'):
+                return 0.0
+            self._refill()
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class StreamThrottle:
+    """Limitador de um stream; regista-se no scheduler enquanto está ativo."""
+
+    def __init__(self, scheduler, cap, burst_seconds):
+        self.scheduler = scheduler
+        self.cap = cap
+        self.burst_seconds = burst_seconds
+        # Rajada inicial dimensionada pela quota justa, não pelo débito global;
+        # o scheduler acerta-a ao registar o stream
+        initial = min(cap, scheduler.fair_share(extra=1))
+        self.bucket = TokenBucket(initial, burst_seconds)
+
+    def __enter__(self):
+        self.scheduler.register(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.scheduler.unregister(self)
+        return False
+
+    def set_rate(self, rate):
+        self.bucket.set_rate(rate)
+
+    def slice_size(self):
+        rate = self.bucket.rate
+        if rate == float('inf'):
+            return None
+        return max(MIN_SLICE_BYTES, int(rate * SLICE_SECONDS))
+
+    def slices(self, data):
+        """Divide um chunk em fatias de ~100 ms de débito."""
+        size = self.slice_size()
+        if not size or len(data) <= size:
+            yield data
+            return
+        for offset in range(0, len(data), size):
+            yield data[offset:offset + size]
+
+    def reserve(self, amount):
+        # A quota do stream e o orçamento global da réplica têm ambos de cobrir o envio
+        wait = max(self.bucket.reserve(amount), self.scheduler.reserve(amount))
+        if wait:
+            THROTTLE_WAIT_SECONDS.inc(wait)
+        return wait
+
+
+class FairShareScheduler:
+    """Reparte o débito global da réplica pelos streams ativos.
+
+    Além das quotas por stream, um bucket global partilhado limita a soma:
+    streams que entram em momentos diferentes não acumulam cada um a sua
+    rajada para lá do orçamento da réplica.
+    """
+
+    def __init__(self, global_rate, burst_seconds=4.0):
+        self.global_rate = global_rate or float('inf')
+        self.bucket = TokenBucket(self.global_rate, burst_seconds)
+        self._streams = []
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        return self.bucket.reserve(amount)
+
+    def register(self, stream):
+        with self._lock:
+            self._streams.append(stream)
+            self._rebalance()
+        THROTTLED_STREAMS.inc()
+
+    def unregister(self, stream):
+        with self._lock:
+            if stream in self._streams:
+                self._streams.remove(stream)
+                self._rebalance()
+        THROTTLED_STREAMS.dec()
+
+    def _rebalance(self):
+        remaining = self.global_rate
+        streams = sorted(self._streams, key=lambda stream: stream.cap)
+        for index, stream in enumerate(streams):
+            share = remaining / (len(streams) - index)
+            rate = min(stream.cap, share)
+            stream.set_rate(rate)
+            remaining -= rate
+
+    def fair_share(self, extra=0):
+        """Débito global dividido pelos streams ativos (+ `extra` a entrar)."""
+        with self._lock:
+            return self.global_rate / max(1, len(self._streams) + extra)
+
+    def active_streams(self):
+        with self._lock:
+            return len(self._streams)
+
+
+class RateLimiter:
+    """Configuração do limitador: cria um StreamThrottle por stream."""
+
+    def __init__(self, max_stream_rate=0, global_rate=0, bitrate_multiplier=0, burst_seconds=4.0):
+        self.max_stream_rate = max_stream_rate or float('inf')
+        self.bitrate_multiplier = bitrate_multiplier
+        self.burst_seconds = burst_seconds
+        self.scheduler = FairShareScheduler(global_rate, burst_seconds)
+
+    @property
+    def enabled(self):
+        return (self.max_stream_rate != float('inf')
+                or self.scheduler.global_rate != float('inf')
+                or self.bitrate_multiplier > 0)
+
+    def stream_cap(self, bitrate=None):
+        """Teto do stream: bitrate do título × multiplicador, limitado ao máximo."""
+        if self.bitrate_multiplier > 0 and bitrate:
+            return min(bitrate * self.bitrate_multiplier, self.max_stream_rate)
+        return self.max_stream_rate
+
+    def throttle(self, bitrate=None):
+        """StreamThrottle para um novo stream, ou None se nada o limitar."""
+        if not self.enabled:
+            return None
+        cap = self.stream_cap(bitrate)
+        if cap == float('inf') and self.scheduler.global_rate == float('inf'):
+            return None
+        return StreamThrottle(self.scheduler, cap, self.burst_seconds)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "max_stream_rate": None if self.max_stream_rate == float('inf') else self.max_stream_rate,
+            "global_rate": None if self.scheduler.global_rate == float('inf') else self.scheduler.global_rate,
+            "bitrate_multiplier": self.bitrate_multiplier,
+            "active_streams": self.scheduler.active_streams()
+        }
+
+
+def throttled(chunks, throttle):
+    """Aplica o limitador a um gerador de chunks (servidor WSGI com threads)."""
+    with throttle:
+        for data in chunks:
+            for piece in throttle.slices(data):
+                wait = throttle.reserve(len(piece))
+                if wait:
+                    time.sleep(wait)
+                yield piece
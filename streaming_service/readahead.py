@@ -0,0 +1,112 @@
+"""
+Read-ahead para pedidos Range sequenciais.
+
+Os players pedem intervalos consecutivos (bytes=N-, depois bytes=M-). Por
+cliente e título guardamos o último intervalo servido; quando um novo pedido
+continua a partir dele o acesso é considerado sequencial e a janela seguinte
+é pedida ao kernel com posix_fadvise(WILLNEED) (ou lida em background onde
+não existir), para que o próximo pedido encontre os dados em page cache.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import Counter
+
+from fd_pool import FileHandlePool
+
+logger = logging.getLogger(__name__)
+
+READAHEAD_REQUESTS = Counter('streaming_readahead_requests_total',
+                             'Pedidos Range classificados pelo detetor de acesso sequencial',
+                             ['pattern'])
+READAHEAD_BYTES = Counter('streaming_readahead_bytes_total',
+                          'Bytes pedidos ao kernel em read-ahead')
+
+
+class ReadAhead:
+    """Deteta acesso sequencial por (cliente, título) e pré-carrega a janela seguinte."""
+
+    def __init__(self, window, max_clients=10000, ttl=300.0, fd_pool=None):
+        self.window = window
+        self.fd_pool = fd_pool or FileHandlePool(max_handles=0)
+        self.max_clients = max_clients
+        self.ttl = ttl
+        self._last = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='readahead')
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def on_request(self, client, filename, file_path, start, length, file_size):
+        """Regista um pedido e agenda o read-ahead se o acesso for sequencial."""
+        if not self.enabled:
+            return False
+        end = start + length
+        now = time.monotonic()
+        key = (client, filename)
+
+        with self._lock:
+            previous = self._last.pop(key, None)
+            self._last[key] = (start, end, now)
+            while len(self._last) > self.max_clients:
+                self._last.popitem(last=False)
+
+        sequential = (
+            previous is not None
+            and now - previous[2] <= self.ttl
+            and previous[0] < start <= previous[1] + self.window
+        )
+        READAHEAD_REQUESTS.labels(pattern='sequential' if sequential else 'random').inc()
+        if not sequential:
+            return False
+
+        # Janela a partir do início do pedido atual e, para intervalos
+        # fechados, também a seguir ao seu fim
+        windows = [(start, min(self.window, file_size - start))]
+        if end < file_size:
+            windows.append((end, min(self.window, file_size - end)))
+        self._executor.submit(self._prefetch, file_path, windows)
+        return True
+
+    def _prefetch(self, file_path, windows):
+        try:
+            handle = self.fd_pool.acquire(file_path)
+        except OSError as e:
+            logger.debug(f"Read-ahead ignorado para {file_path}: {e}")
+            return
+        fd = handle.fd
+        try:
+            for offset, length in windows:
+                if length <= 0:
+                    continue
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(fd, offset, length, os.POSIX_FADV_WILLNEED)
+                else:
+                    remaining = length
+                    while remaining > 0:
+                        data = os.pread(fd, min(1024 * 1024, remaining), offset)
+                        if not data:
+                            break
+                        offset += len(data)
+                        remaining -= len(data)
+                READAHEAD_BYTES.inc(length)
+        except OSError as e:
+            logger.debug(f"Erro no read-ahead de {file_path}: {e}")
+        finally:
+            self.fd_pool.release(handle)
+
+    def stats(self):
+        with self._lock:
+            tracked = len(self._last)
+        return {
+            "enabled": self.enabled,
+            "window_bytes": self.window,
+            "tracked_clients": tracked
+        }
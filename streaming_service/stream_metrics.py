@@ -0,0 +1,150 @@
+"""
+Métricas Prometheus por stream de vídeo.
+
+Regista bytes enviados (por título), time-to-first-byte, duração e débito de
+cada stream, streams em curso e streams abortados pelo cliente.
+
+No caminho sendfile o servidor envia o arquivo sem passar por Python e o
+gunicorn repõe a posição do arquivo no fim, pelo que não se sabe quantos
+bytes chegaram ao cliente. Esses streams contam em
+streaming_bytes_requested_total (Content-Length entregue ao servidor) e não
+em streaming_bytes_sent_total; streaming_streams_aborted_total também não
+os cobre. O TTFB corresponde ao momento em que o arquivo é entregue ao
+servidor.
+"""
+
+import os
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Com muitos títulos o label `video` pode ser desativado (fica "all")
+PER_TITLE_METRICS = os.environ.get('STREAM_METRICS_PER_TITLE', 'true').lower() == 'true'
+
+STREAM_BYTES_SENT = Counter('streaming_bytes_sent_total',
+                            'Bytes de vídeo enviados aos clientes',
+                            ['video'])
+STREAM_BYTES_REQUESTED = Counter('streaming_bytes_requested_total',
+                                 'Bytes entregues ao servidor por sendfile (envio efetivo desconhecido)',
+                                 ['video'])
+STREAMS_TOTAL = Counter('streaming_streams_total',
+                        'Streams iniciados por modo de transferência',
+                        ['mode'])
+STREAMS_ABORTED = Counter('streaming_streams_aborted_total',
+                          'Streams interrompidos antes de enviar todos os bytes',
+                          ['video'])
+STREAMS_IN_FLIGHT = Gauge('streaming_streams_in_flight',
+                          'Streams de vídeo em curso')
+STREAM_TTFB = Histogram('streaming_time_to_first_byte_seconds',
+                        'Tempo até ao primeiro byte do corpo do stream',
+                        buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5))
+STREAM_DURATION = Histogram('streaming_stream_duration_seconds',
+                            'Duração total de cada stream',
+                            buckets=(.05, .1, .5, 1, 5, 15, 30, 60, 300, 900, 1800, 3600))
+STREAM_THROUGHPUT = Histogram('streaming_stream_throughput_bytes_per_second',
+                              'Débito médio de cada stream',
+                              buckets=(64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6, 1e9))
+
+
+class StreamMeter:
+    """Acompanha um stream desde o pedido até o corpo ser fechado."""
+
+    def __init__(self, filename, mode, length):
+        self.video = filename if PER_TITLE_METRICS else 'all'
+        self.mode = mode
+        self.length = length
+        self.requested_at = time.monotonic()
+        self.first_byte_at = None
+        self.bytes_sent = 0
+        self.active = False
+        self.finished = False
+
+    def begin(self):
+        if not self.active:
+            self.active = True
+            STREAMS_IN_FLIGHT.inc()
+            STREAMS_TOTAL.labels(mode=self.mode).inc()
+
+    def first_byte(self):
+        if self.first_byte_at is None:
+            self.first_byte_at = time.monotonic()
+            STREAM_TTFB.observe(self.first_byte_at - self.requested_at)
+
+    def add(self, sent):
+        if sent > 0:
+            self.bytes_sent += sent
+            STREAM_BYTES_SENT.labels(video=self.video).inc(sent)
+
+    def add_requested(self, length):
+        if length > 0:
+            STREAM_BYTES_REQUESTED.labels(video=self.video).inc(length)
+
+    def finish(self, aborted=None):
+        if self.finished or not self.active:
+            return
+        self.finished = True
+        STREAMS_IN_FLIGHT.dec()
+        if aborted is None:
+            aborted = self.bytes_sent < self.length
+        if aborted:
+            STREAMS_ABORTED.labels(video=self.video).inc()
+
+        duration = time.monotonic() - self.requested_at
+        STREAM_DURATION.observe(duration)
+        if duration > 0 and self.bytes_sent:
+            STREAM_THROUGHPUT.observe(self.bytes_sent / duration)
+
+    def wrap(self, chunks):
+        """Instrumenta um gerador de chunks do corpo da resposta."""
+        self.begin()
+        completed = False
+        try:
+            for data in chunks:
+                self.first_byte()
+                yield data
+                self.add(len(data))
+            completed = True
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close:
+                close()
+            self.finish(aborted=not completed)
+
+    def wrap_file(self, f, start):
+        """Proxy do arquivo entregue ao wsgi.file_wrapper."""
+        self.begin()
+        self.first_byte()
+        return MeteredFile(f, self, start)
+
+
+class MeteredFile:
+    """Delegação transparente para o arquivo; contabiliza os bytes no close().
+
+    Se o arquivo foi lido por Python a posição dá os bytes enviados; se a
+    posição foi reposta (sendfile) só se sabe quantos bytes foram pedidos.
+    """
+
+    def __init__(self, f, meter, start):
+        self._f = f
+        self._meter = meter
+        self._start = start
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def close(self):
+        if self._f.closed:
+            return
+        try:
+            sent = self._f.tell() - self._start
+        except (OSError, ValueError):
+            sent = 0
+        if sent > 0:
+            self._meter.add(min(sent, self._meter.length))
+            self._meter.finish()
+        else:
+            # Posição reposta pelo servidor (gunicorn/os.sendfile): um stream
+            # interrompido não é distinguível, não conta como abortado
+            self._meter.add_requested(self._meter.length)
+            self._meter.finish(aborted=False)
+        self._f.close()
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from rate_limit import FairShareScheduler, RateLimiter, StreamThrottle, throttled
+
+GLOBAL_RATE = 1_000_000
+
+
+def stream_concurrently(limiter, streams, duration):
+    """Corre `streams` streams limitados em paralelo; devolve (bytes, segundos)."""
+    sent, lock = [0], threading.Lock()
+    chunk = b'x' * (256 * 1024)
+    start = time.monotonic()
+    deadline = start + duration
+
+    def drain(body):
+        for data in throttled(body, limiter.throttle()):
+            with lock:
+                sent[0] += len(data)
+
+    threads = [
+        threading.Thread(target=drain, args=(iter(lambda: chunk if time.monotonic() < deadline else None, None),))
+        for _ in range(streams)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sent[0], time.monotonic() - start
+
+
+def test_global_rate_bounds_aggregate_throughput():
+    limiter = RateLimiter(global_rate=GLOBAL_RATE, burst_seconds=0.05)
+    sent, elapsed = stream_concurrently(limiter, 4, 1.0)
+    assert sent / elapsed <= GLOBAL_RATE * 1.1
+
+
+def test_burst_is_shared_between_new_streams():
+    # Com rajada de 4s por stream, 4 streams novos não podem somar 4 x 4s
+    limiter = RateLimiter(global_rate=GLOBAL_RATE, burst_seconds=4)
+    sent, elapsed = stream_concurrently(limiter, 4, 0.5)
+    assert sent <= GLOBAL_RATE * (elapsed + 4) * 1.1
+
+
+def test_new_stream_shrinks_existing_bursts():
+    scheduler = FairShareScheduler(GLOBAL_RATE)
+    first = StreamThrottle(scheduler, float('inf'), 4)
+    with first:
+        assert first.bucket.tokens == 4 * GLOBAL_RATE
+        second = StreamThrottle(scheduler, float('inf'), 4)
+        with second:
+            assert first.bucket.rate == second.bucket.rate == GLOBAL_RATE / 2
+            assert first.bucket.tokens <= 2 * GLOBAL_RATE
+            assert second.bucket.tokens <= 2 * GLOBAL_RATE
+
+
+def test_capped_stream_leaves_share_to_others():
+    scheduler = FairShareScheduler(GLOBAL_RATE)
+    slow = StreamThrottle(scheduler, 100_000, 4)
+    fast = StreamThrottle(scheduler, float('inf'), 4)
+    with slow, fast:
+        assert slow.bucket.rate == 100_000
+        assert fast.bucket.rate == 900_000
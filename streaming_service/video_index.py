@@ -0,0 +1,174 @@
+"""
+Índice incremental em memória do diretório /videos.
+
+Uma thread em background aplica deltas de os.scandir ao índice e mantém
+totais acumulados, para que /health, /status e /list respondam sem listar
+nem fazer stat ao diretório em cada pedido. O diretório só é percorrido por
+completo quando o seu mtime muda (arquivos criados/removidos) ou a cada
+`full_scan_every` ciclos; nos restantes ciclos apenas os arquivos
+modificados recentemente (uploads ainda a ser escritos) são revistos.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+
+def is_video_file(filename):
+    return filename.lower().endswith(VIDEO_EXTENSIONS)
+
+
+class VideoIndex:
+    """Índice de arquivos do diretório de vídeos com totais em O(1)."""
+
+    def __init__(self, folder, interval=5.0, recent_window=120.0, full_scan_every=60, on_change=None):
+        self.folder = folder
+        self.interval = interval
+        self.recent_window = recent_window
+        self.full_scan_every = full_scan_every
+        # on_change(filename) é chamado para cada arquivo alterado ou removido
+        self.on_change = on_change
+        self._files = {}
+        # Nomes dos vídeos ordenados, para paginação por cursor
+        self._video_names = []
+        self._lock = threading.Lock()
+        self._dir_mtime_ns = None
+        self._cycles = 0
+        self._thread = None
+        self.ready = False
+        self.last_refresh = None
+        self.video_count = 0
+        self.video_bytes = 0
+        self.file_count = 0
+        self.total_bytes = 0
+
+    def start(self):
+        """Faz a primeira indexação e arranca a thread de atualização."""
+        self.refresh(full=True)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Erro ao atualizar índice de vídeos: {e}")
+
+    def refresh(self, full=False):
+        """Aplica ao índice o delta do diretório desde a última passagem."""
+        dir_mtime_ns = os.stat(self.folder).st_mtime_ns
+        self._cycles += 1
+        full = (full or not self.ready or dir_mtime_ns != self._dir_mtime_ns
+                or self._cycles % self.full_scan_every == 0)
+
+        if full:
+            current = {}
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            st = entry.stat()
+                            current[entry.name] = (st.st_size, st.st_mtime)
+                    except FileNotFoundError:
+                        continue
+            with self._lock:
+                known = set(self._files)
+            changes = {name: current.get(name) for name in known | set(current)}
+        else:
+            # Sem entradas novas/removidas: rever só arquivos recentes
+            cutoff = time.time() - self.recent_window
+            with self._lock:
+                recent = [name for name, (_, mtime) in self._files.items() if mtime >= cutoff]
+            changes = {}
+            for name in recent:
+                try:
+                    st = os.stat(os.path.join(self.folder, name))
+                    changes[name] = (st.st_size, st.st_mtime)
+                except FileNotFoundError:
+                    changes[name] = None
+
+        changed = self._apply(changes)
+        self._dir_mtime_ns = dir_mtime_ns
+        self.ready = True
+        self.last_refresh = time.time()
+
+        if self.on_change:
+            for name in changed:
+                self.on_change(name)
+        return len(changed)
+
+    def _apply(self, changes):
+        changed = []
+        with self._lock:
+            for name, value in changes.items():
+                old = self._files.get(name)
+                if old == value:
+                    continue
+                if old is not None:
+                    self._account(name, old, -1)
+                if value is None:
+                    self._files.pop(name, None)
+                    if is_video_file(name):
+                        index = bisect.bisect_left(self._video_names, name)
+                        if index < len(self._video_names) and self._video_names[index] == name:
+                            del self._video_names[index]
+                else:
+                    self._files[name] = value
+                    self._account(name, value, 1)
+                    if old is None and is_video_file(name):
+                        bisect.insort(self._video_names, name)
+                changed.append(name)
+        return changed
+
+    def _account(self, name, value, sign):
+        size = value[0]
+        self.file_count += sign
+        self.total_bytes += sign * size
+        if is_video_file(name):
+            self.video_count += sign
+            self.video_bytes += sign * size
+
+    def videos(self):
+        """Lista (filename, size, mtime) dos vídeos indexados, por nome."""
+        return self.videos_page()[0]
+
+    def videos_page(self, after=None, limit=None):
+        """Página de vídeos ordenada por nome, a seguir ao cursor `after`.
+
+        Devolve (videos, next_cursor); next_cursor é None na última página.
+        """
+        with self._lock:
+            start = bisect.bisect_right(self._video_names, after) if after else 0
+            end = len(self._video_names) if limit is None else start + limit
+            names = self._video_names[start:end]
+            page = [(name,) + self._files[name] for name in names]
+            has_more = end < len(self._video_names)
+        next_cursor = names[-1] if names and has_more else None
+        return page, next_cursor
+
+    def iter_videos(self, after=None, batch_size=1000):
+        """Itera todos os vídeos a partir do cursor, em lotes sob o lock."""
+        while True:
+            page, after = self.videos_page(after, batch_size)
+            yield from page
+            if after is None:
+                return
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "files": self.file_count,
+            "videos": self.video_count,
+            "last_refresh": self.last_refresh,
+            "interval_seconds": self.interval
+        }
@@ -0,0 +1,148 @@
+"""
+Empacotamento adaptativo (HLS + DASH) dos vídeos processados.
+
+Um único ffmpeg descodifica o original uma vez, gera a escada de renditions
+(resolução/bitrate) e segmenta-as em fMP4 (CMAF). O mesmo conjunto de
+segmentos é referenciado pelo manifest DASH (manifest.mpd) e pelas playlists
+HLS (master.m3u8), escritos em <pasta de vídeos>/packaged/<filename>/ e
+servidos pelo streaming_service em /stream/<filename>/<asset>.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PACKAGED_DIRNAME = 'packaged'
+DASH_MANIFEST = 'manifest.mpd'
+HLS_MANIFEST = 'master.m3u8'
+AUDIO_BITRATE_KBPS = 128
+
+
+def parse_ladder(spec):
+    """Converte "1080:5000,720:2800" em [(1080, 5000), (720, 2800)] (altura, kbps)."""
+    ladder = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        height, kbps = item.split(':')
+        ladder.append((int(height), int(kbps)))
+    return sorted(ladder, reverse=True)
+
+
+def probe_streams(video_info):
+    """Devolve (altura do vídeo, tem áudio) a partir da saída do ffprobe."""
+    height = None
+    has_audio = False
+    for stream in (video_info or {}).get('streams', []):
+        if stream.get('codec_type') == 'video' and height is None:
+            height = stream.get('height')
+        elif stream.get('codec_type') == 'audio':
+            has_audio = True
+    return height, has_audio
+
+
+def select_renditions(ladder, source_height):
+    """Escolhe os degraus da escada que não fazem upscale do original."""
+    if not source_height:
+        return ladder[-1:]
+    renditions = [(height, kbps) for height, kbps in ladder if height <= source_height]
+    if not renditions:
+        # Original mais pequeno que o degrau mínimo: uma rendition à resolução original
+        renditions = [(source_height - source_height % 2, ladder[-1][1])]
+    return renditions
+
+
+def build_package_command(filepath, manifest_path, renditions, has_audio,
+                          segment_seconds=4, preset='veryfast'):
+    """Comando ffmpeg que produz todas as renditions e os manifests numa passagem."""
+    labels = ''.join(f'[v{i}]' for i in range(len(renditions)))
+    filters = [f'[0:v]split={len(renditions)}{labels}']
+    filters += [f'[v{i}]scale=-2:{height}[v{i}out]' for i, (height, _) in enumerate(renditions)]
+
+    cmd = ['ffmpeg', '-v', 'error', '-y', '-i', filepath,
+           '-filter_complex', ';'.join(filters)]
+    for i, (_, kbps) in enumerate(renditions):
+        cmd += ['-map', f'[v{i}out]',
+                f'-c:v:{i}', 'libx264',
+                f'-b:v:{i}', f'{kbps}k',
+                f'-maxrate:v:{i}', f'{int(kbps * 1.1)}k',
+                f'-bufsize:v:{i}', f'{kbps * 2}k']
+
+    # Keyframes alinhados com os segmentos em todas as renditions, para que
+    # o player possa trocar de bitrate em qualquer fronteira de segmento
+    cmd += ['-preset', preset, '-pix_fmt', 'yuv420p', '-sc_threshold', '0',
+            '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})']
+
+    adaptation_sets = 'id=0,streams=v'
+    if has_audio:
+        cmd += ['-map', '0:a:0', '-c:a', 'aac', '-b:a', f'{AUDIO_BITRATE_KBPS}k', '-ac', '2']
+        adaptation_sets += ' id=1,streams=a'
+
+    cmd += ['-f', 'dash',
+            '-seg_duration', str(segment_seconds),
+            '-use_template', '1',
+            '-use_timeline', '1',
+            '-init_seg_name', 'init-$RepresentationID$.m4s',
+            '-media_seg_name', 'chunk-$RepresentationID$-$Number%05d$.m4s',
+            '-adaptation_sets', adaptation_sets,
+            '-hls_playlist', '1',
+            manifest_path]
+    return cmd
+
+
+def package_video(filepath, filename, video_info, video_folder, ladder,
+                  segment_seconds=4, preset='veryfast', timeout=1800):
+    """Empacota o vídeo em HLS/DASH e devolve o resumo a guardar no documento.
+
+    O pacote é escrito num diretório temporário e só depois renomeado para o
+    destino final, para que o streaming nunca sirva um pacote incompleto.
+    """
+    packaged_root = os.path.join(video_folder, PACKAGED_DIRNAME)
+    staging_dir = os.path.join(packaged_root, f'.{filename}.tmp')
+    final_dir = os.path.join(packaged_root, filename)
+
+    source_height, has_audio = probe_streams(video_info)
+    renditions = select_renditions(ladder, source_height)
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    cmd = build_package_command(
+        filepath,
+        os.path.join(staging_dir, DASH_MANIFEST),
+        renditions,
+        has_audio,
+        segment_seconds=segment_seconds,
+        preset=preset
+    )
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg terminou com código {result.returncode}: {result.stderr[-500:]}")
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    if os.path.exists(final_dir):
+        previous_dir = os.path.join(packaged_root, f'.{filename}.old')
+        shutil.rmtree(previous_dir, ignore_errors=True)
+        os.rename(final_dir, previous_dir)
+        shutil.rmtree(previous_dir, ignore_errors=True)
+    os.rename(staging_dir, final_dir)
+
+    relative_dir = f'{PACKAGED_DIRNAME}/{filename}'
+    return {
+        'format': 'cmaf',
+        'hls_manifest': f'{relative_dir}/{HLS_MANIFEST}',
+        'dash_manifest': f'{relative_dir}/{DASH_MANIFEST}',
+        'segment_seconds': segment_seconds,
+        'renditions': [
+            {'height': height, 'bitrate_kbps': kbps} for height, kbps in renditions
+        ],
+        'audio': has_audio,
+        'packaged_at': datetime.utcnow()
+    }
@@ -0,0 +1,61 @@
+"""
+Remux "faststart" de MP4/MOV: move o átomo moov para antes do mdat.
+
+Com o índice no fim do arquivo o player tem de pedir a cauda por Range
+antes de começar a reproduzir. O remux é sem perdas (-c copy) e substitui o
+original atomicamente, pelo que streams em curso continuam a ler o inode
+antigo e o streaming_service deteta a alteração pelo novo ETag.
+"""
+
+import os
+import struct
+import subprocess
+
+
+def moov_before_mdat(filepath):
+    """True/False conforme a posição do moov; None se não for um MP4 reconhecível."""
+    file_size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as f:
+        offset = 0
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            size, box_type = struct.unpack('>I4s', header)
+            if size == 1:
+                size = struct.unpack('>Q', f.read(8))[0]
+            elif size == 0:
+                size = file_size - offset
+            if offset == 0 and box_type != b'ftyp':
+                return None
+            if box_type == b'moov':
+                return True
+            if box_type == b'mdat':
+                return False
+            if size < 8:
+                return None
+            offset += size
+    return None
+
+
+def remux_faststart(filepath, timeout=600):
+    """Reescreve o arquivo com o moov à frente; devolve True se foi remuxado."""
+    directory, filename = os.path.split(filepath)
+    temp_path = os.path.join(directory, f'.{filename}.faststart.tmp')
+    cmd = [
+        'ffmpeg', '-v', 'error', '-y', '-i', filepath,
+        '-map', '0', '-c', 'copy', '-movflags', '+faststart',
+        '-f', 'mp4', temp_path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg terminou com código {result.returncode}: {result.stderr[-500:]}")
+        if not moov_before_mdat(temp_path):
+            raise RuntimeError("Remux não colocou o moov antes do mdat")
+        os.replace(temp_path, filepath)
+        return True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
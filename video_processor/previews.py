@@ -0,0 +1,108 @@
+"""
+Pré-visualizações para a barra de seek: sprite sheet + faixa WebVTT.
+
+Um único ffmpeg extrai um frame a cada `interval` segundos (só keyframes são
+descodificados) e junta-os numa grelha JPEG. A faixa WebVTT mapeia cada
+intervalo de tempo para o retângulo correspondente na grelha
+(sprite.jpg#xywh=x,y,w,h), pelo que o player carrega toda a pré-visualização
+com um único pedido. Os arquivos ficam em <pasta de vídeos>/previews/<filename>/
+e são servidos pelo streaming_service em /stream/<filename>/preview/<asset>.
+"""
+
+import math
+import os
+import shutil
+import subprocess
+
+PREVIEWS_DIRNAME = 'previews'
+SPRITE_NAME = 'sprite.jpg'
+TRACK_NAME = 'thumbnails.vtt'
+
+
+def preview_layout(duration, interval, max_tiles, columns):
+    """Devolve (intervalo efetivo, nº de tiles, colunas, linhas) para a duração dada."""
+    interval = max(interval, duration / max_tiles)
+    tiles = max(1, math.ceil(duration / interval))
+    columns = min(columns, tiles)
+    rows = math.ceil(tiles / columns)
+    return interval, tiles, columns, rows
+
+
+def tile_size(video_info, tile_width):
+    """Altura do tile (par) que preserva o aspeto do vídeo original."""
+    for stream in (video_info or {}).get('streams', []):
+        if stream.get('codec_type') == 'video' and stream.get('width') and stream.get('height'):
+            height = round(tile_width * stream['height'] / stream['width'])
+            return tile_width, max(2, height - height % 2)
+    return tile_width, round(tile_width * 9 / 16) // 2 * 2
+
+
+def build_sprite_command(filepath, output_path, interval, width, height, columns, rows):
+    return [
+        'ffmpeg', '-v', 'error', '-y',
+        '-skip_frame', 'nokey', '-i', filepath,
+        '-vf', f'fps=1/{interval:.3f},scale={width}:{height},tile={columns}x{rows}',
+        '-frames:v', '1', '-q:v', '5',
+        output_path
+    ]
+
+
+def format_timestamp(seconds):
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f'{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}'
+
+
+def write_thumbnail_track(track_path, duration, interval, tiles, width, height, columns):
+    """Escreve a faixa WebVTT com uma cue por tile."""
+    lines = ['WEBVTT', '']
+    for index in range(tiles):
+        start = index * interval
+        end = min(duration, start + interval)
+        x = (index % columns) * width
+        y = (index // columns) * height
+        lines.append(f'{format_timestamp(start)} --> {format_timestamp(end)}')
+        lines.append(f'{SPRITE_NAME}#xywh={x},{y},{width},{height}')
+        lines.append('')
+    with open(track_path, 'w') as f:
+        f.write('\n'.join(lines))
+
+
+def create_seek_previews(filepath, filename, video_info, video_folder, interval=5,
+                         tile_width=160, columns=10, max_tiles=100, timeout=300):
+    """Gera sprite + WebVTT e devolve o resumo a guardar no documento do vídeo."""
+    duration = float(video_info['format']['duration'])
+    interval, tiles, columns, rows = preview_layout(duration, interval, max_tiles, columns)
+    width, height = tile_size(video_info, tile_width)
+
+    previews_root = os.path.join(video_folder, PREVIEWS_DIRNAME)
+    staging_dir = os.path.join(previews_root, f'.{filename}.tmp')
+    final_dir = os.path.join(previews_root, filename)
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    try:
+        cmd = build_sprite_command(filepath, os.path.join(staging_dir, SPRITE_NAME),
+                                   interval, width, height, columns, rows)
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg terminou com código {result.returncode}: {result.stderr[-500:]}")
+        write_thumbnail_track(os.path.join(staging_dir, TRACK_NAME),
+                              duration, interval, tiles, width, height, columns)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.rename(staging_dir, final_dir)
+
+    relative_dir = f'{PREVIEWS_DIRNAME}/{filename}'
+    return {
+        'sprite': f'{relative_dir}/{SPRITE_NAME}',
+        'track': f'{relative_dir}/{TRACK_NAME}',
+        'interval': round(interval, 3),
+        'tiles': tiles,
+        'tile_width': width,
+        'tile_height': height,
+        'columns': columns
+    }
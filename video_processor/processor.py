@@ -6,11 +6,16 @@ import time
 import logging
 import threading
 import subprocess
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, jsonify
 from prometheus_client import Counter, Histogram, Gauge, start_http_server
 from datetime import datetime
 from bson import ObjectId
 from db_mongodb import get_mongodb_manager, with_write_db, with_read_db
+from abr_packaging import package_video, parse_ladder
+from faststart import moov_before_mdat, remux_faststart
+from previews import create_seek_previews
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -21,6 +26,10 @@ VIDEOS_PROCESSED = Counter('videos_processed_total', 'Total videos processed')
 VIDEOS_FAILED = Counter('videos_failed_total', 'Total videos failed')
 PROCESSING_TIME = Histogram('video_processing_seconds', 'Time spent processing videos')
 QUEUE_SIZE = Gauge('video_queue_size', 'Current queue size')
+ACTIVE_JOBS = Gauge('video_processing_active_jobs', 'Videos currently being processed')
+FASTSTART_REMUXED = Counter('video_faststart_remuxed_total', 'Total videos remuxed with the moov atom at the front')
+PACKAGING_TIME = Histogram('video_packaging_seconds', 'Time spent packaging HLS/DASH renditions')
+PACKAGING_FAILED = Counter('video_packaging_failed_total', 'Total HLS/DASH packaging failures')
 
 # Diretório onde os vídeos estão armazenados
 VIDEO_FOLDER = '/videos'
@@ -31,10 +40,41 @@ QUEUE_HOST = os.environ.get('QUEUE_HOST', 'queue_service')
 QUEUE_USER = os.environ.get('QUEUE_USER', 'ualflix')
 QUEUE_PASSWORD = os.environ.get('QUEUE_PASSWORD', 'ualflix_password')
 
+# Consumidores em paralelo: cada thread tem a sua conexão e canal (o pika
+# BlockingConnection não é thread-safe). O trabalho pesado corre em
+# subprocessos ffmpeg, pelo que as threads escalam com os cores. Vídeos em
+# paralelo = PROCESSOR_WORKERS x PROCESSOR_PREFETCH.
+PROCESSOR_WORKERS = int(os.environ.get('PROCESSOR_WORKERS', os.cpu_count() or 1))
+PROCESSOR_PREFETCH = int(os.environ.get('PROCESSOR_PREFETCH', 1))
+
+# Etapas independentes de um mesmo vídeo (thumbnail, sprite) correm aqui
+stage_executor = ThreadPoolExecutor(
+    max_workers=max(1, 2 * PROCESSOR_WORKERS * PROCESSOR_PREFETCH),
+    thread_name_prefix='stage'
+)
+
+# Remux sem perdas com o moov à frente (reprodução progressiva imediata)
+FASTSTART_ENABLED = os.environ.get('FASTSTART_ENABLED', 'true').lower() == 'true'
+FASTSTART_TIMEOUT = int(os.environ.get('FASTSTART_TIMEOUT', 600))
+
+# Sprite sheet + faixa WebVTT para pré-visualização na barra de seek
+PREVIEW_ENABLED = os.environ.get('PREVIEW_ENABLED', 'true').lower() == 'true'
+PREVIEW_INTERVAL = float(os.environ.get('PREVIEW_INTERVAL', 5))
+PREVIEW_TILE_WIDTH = int(os.environ.get('PREVIEW_TILE_WIDTH', 160))
+PREVIEW_COLUMNS = int(os.environ.get('PREVIEW_COLUMNS', 10))
+PREVIEW_MAX_TILES = int(os.environ.get('PREVIEW_MAX_TILES', 100))
+
+# Empacotamento HLS/DASH (escada "altura:kbps" separada por vírgulas)
+PACKAGING_ENABLED = os.environ.get('PACKAGING_ENABLED', 'true').lower() == 'true'
+PACKAGING_LADDER = parse_ladder(os.environ.get('PACKAGING_RENDITIONS', '1080:5000,720:2800,480:1400,360:800'))
+PACKAGING_SEGMENT_SECONDS = int(os.environ.get('PACKAGING_SEGMENT_SECONDS', 4))
+PACKAGING_PRESET = os.environ.get('PACKAGING_PRESET', 'veryfast')
+PACKAGING_TIMEOUT = int(os.environ.get('PACKAGING_TIMEOUT', 1800))
+
 app = Flask(__name__)
 
 @with_write_db
-def update_video_processing_status(db, video_id, status, duration=None, file_size=None, thumbnail_path=None, error_message=None):
+def update_video_processing_status(db, video_id, status, duration=None, file_size=None, thumbnail_path=None, error_message=None, progressive_ready=None, seek_preview=None):
     """Atualiza status do processamento no MongoDB"""
     try:
         update_doc = {
@@ -56,6 +96,12 @@ def update_video_processing_status(db, video_id, status, duration=None, file_siz
         if error_message is not None:
             update_doc['$set']['error_message'] = error_message
         
+        if progressive_ready is not None:
+            update_doc['$set']['progressive_ready'] = progressive_ready
+        
+        if seek_preview is not None:
+            update_doc['$set']['seek_preview'] = seek_preview
+        
         result = db.videos.update_one(
             {'_id': ObjectId(video_id)},
             update_doc
@@ -67,6 +113,24 @@ def update_video_processing_status(db, video_id, status, duration=None, file_siz
         logger.error(f"Erro ao atualizar status do vídeo {video_id}: {e}")
         return False
 
+@with_write_db
+def update_video_packaging(db, video_id, packaging):
+    """Regista o pacote HLS/DASH de um vídeo já ativo.
+    
+    Uploads deduplicados contra este vídeo enquanto o empacotamento corria
+    copiaram os campos processados sem `packaging`: recebem-no também.
+    """
+    try:
+        oid = ObjectId(video_id)
+        result = db.videos.update_many(
+            {'$or': [{'_id': oid}, {'deduplicated_from': oid}]},
+            {'$set': {'packaging': packaging, 'updated_at': datetime.utcnow()}}
+        )
+        return result.modified_count > 0
+    except Exception as e:
+        logger.error(f"Erro ao registar pacote HLS/DASH do vídeo {video_id}: {e}")
+        return False
+
 @with_read_db
 def get_video_info_from_db(db, video_id):
     """Obtém informações do vídeo do MongoDB"""
@@ -214,7 +278,7 @@ def connect_to_rabbitmq():
         channel.queue_declare(queue='video_processing', durable=True)
         
         # Configura QoS para não sobrecarregar o worker
-        channel.basic_qos(prefetch_count=1)
+        channel.basic_qos(prefetch_count=PROCESSOR_PREFETCH)
         
         return connection, channel
     except Exception as e:
@@ -236,10 +300,14 @@ def get_video_info(filepath):
     return None
 
 def create_thumbnail(filepath, output_path):
-    """Cria uma thumbnail do vídeo."""
+    """Cria uma thumbnail do vídeo.
+    
+    O -ss antes do -i faz seek no demuxer (até ao keyframe anterior) em vez
+    de descodificar o vídeo desde o início.
+    """
     try:
         cmd = [
-            'ffmpeg', '-i', filepath, '-ss', '00:00:01.000', '-vframes', '1',
+            'ffmpeg', '-ss', '00:00:01.000', '-i', filepath, '-vframes', '1',
             '-vf', 'scale=320:240', '-y', output_path
         ]
         result = subprocess.run(cmd, capture_output=True, timeout=60)
@@ -248,6 +316,63 @@ def create_thumbnail(filepath, output_path):
         logger.warning(f"Erro ao criar thumbnail: {e}")
         return False
 
+def ensure_faststart(filepath):
+    """Garante o moov à frente do mdat; devolve se o arquivo está pronto para reprodução progressiva."""
+    try:
+        position = moov_before_mdat(filepath)
+        if position is None:
+            logger.info(f"Faststart ignorado (não é MP4/MOV): {filepath}")
+            return False
+        if position:
+            return True
+        if not FASTSTART_ENABLED:
+            return False
+        remux_faststart(filepath, timeout=FASTSTART_TIMEOUT)
+        FASTSTART_REMUXED.inc()
+        logger.info(f"Moov movido para o início: {filepath}")
+        return True
+    except Exception as e:
+        logger.warning(f"Erro no remux faststart: {e}")
+        return False
+
+def create_preview_sprite(filepath, filename, video_info):
+    """Gera sprite sheet + WebVTT; uma falha não impede a ativação do vídeo."""
+    try:
+        return create_seek_previews(
+            filepath,
+            filename,
+            video_info,
+            VIDEO_FOLDER,
+            interval=PREVIEW_INTERVAL,
+            tile_width=PREVIEW_TILE_WIDTH,
+            columns=PREVIEW_COLUMNS,
+            max_tiles=PREVIEW_MAX_TILES
+        )
+    except Exception as e:
+        logger.warning(f"Erro ao criar sprite de pré-visualização: {e}")
+        return None
+
+def create_adaptive_package(filepath, filename, video_info):
+    """Gera as renditions HLS/DASH; uma falha não impede a reprodução progressiva."""
+    start_time = time.time()
+    try:
+        packaging = package_video(
+            filepath,
+            filename,
+            video_info,
+            VIDEO_FOLDER,
+            PACKAGING_LADDER,
+            segment_seconds=PACKAGING_SEGMENT_SECONDS,
+            preset=PACKAGING_PRESET,
+            timeout=PACKAGING_TIMEOUT
+        )
+        PACKAGING_TIME.observe(time.time() - start_time)
+        return packaging
+    except Exception as e:
+        PACKAGING_FAILED.inc()
+        logger.warning(f"Erro ao empacotar HLS/DASH: {e}")
+        return None
+
 def process_video(video_data):
     """Processa o vídeo - análise, thumbnail, validação, etc."""
     video_id = video_data.get('id')
@@ -263,6 +388,9 @@ def process_video(video_data):
         'success': False,
         'info': None,
         'thumbnail': False,
+        'packaging': None,
+        'progressive_ready': False,
+        'seek_preview': None,
         'duration': 0,
         'file_size': 0,
         'errors': []
@@ -276,10 +404,19 @@ def process_video(video_data):
         if not os.path.exists(filepath):
             raise Exception(f"Arquivo não encontrado: {filepath}")
         
+        # Mover o índice (moov) para o início antes das restantes etapas
+        processing_results['progressive_ready'] = ensure_faststart(filepath)
+        
         # Obter tamanho do arquivo
         file_size = os.path.getsize(filepath)
         processing_results['file_size'] = file_size
         
+        # A thumbnail não depende do ffprobe: corre em paralelo com a análise,
+        # cada etapa no seu subprocesso
+        thumbnail_filename = f"thumb_{filename}.jpg"
+        thumbnail_path = os.path.join(VIDEO_FOLDER, thumbnail_filename)
+        thumbnail_job = stage_executor.submit(create_thumbnail, filepath, thumbnail_path)
+        
         # Obter informações do vídeo
         video_info = get_video_info(filepath)
         if video_info:
@@ -293,18 +430,21 @@ def process_video(video_data):
             except:
                 pass
         
-        # Criar thumbnail
-        thumbnail_filename = f"thumb_{filename}.jpg"
-        thumbnail_path = os.path.join(VIDEO_FOLDER, thumbnail_filename)
+        # Sprite de pré-visualização (precisa da duração) em paralelo com a thumbnail
+        preview_job = None
+        if PREVIEW_ENABLED and processing_results['duration']:
+            preview_job = stage_executor.submit(create_preview_sprite, filepath, filename, video_info)
         
-        if create_thumbnail(filepath, thumbnail_path):
+        if thumbnail_job.result():
             processing_results['thumbnail'] = True
             logger.info(f"Thumbnail criada: {thumbnail_filename}")
         
-        logger.info(f"Tamanho do arquivo: {file_size / (1024*1024):.2f} MB")
+        if preview_job is not None:
+            processing_results['seek_preview'] = preview_job.result()
+            if processing_results['seek_preview']:
+                logger.info(f"Sprite de pré-visualização criado: {processing_results['seek_preview']['tiles']} frames")
         
-        # Simular processamento adicional
-        time.sleep(2)
+        logger.info(f"Tamanho do arquivo: {file_size / (1024*1024):.2f} MB")
         
         # Atualizar MongoDB com resultados do processamento
         update_success = update_video_processing_status(
@@ -312,7 +452,9 @@ def process_video(video_data):
             status='active',
             duration=processing_results['duration'],
             file_size=file_size,
-            thumbnail_path=thumbnail_filename if processing_results['thumbnail'] else None
+            thumbnail_path=thumbnail_filename if processing_results['thumbnail'] else None,
+            progressive_ready=processing_results['progressive_ready'],
+            seek_preview=processing_results['seek_preview']
         )
         
         if update_success:
@@ -345,17 +487,43 @@ def process_video(video_data):
         
         logger.info(f"Processamento concluído em {processing_time:.2f} segundos")
     
+    # Empacotamento HLS/DASH só depois da ativação: o MP4 (já com faststart)
+    # é reproduzível progressivamente, pelo que o encode das renditions não
+    # atrasa a passagem a 'active'
+    if processing_results['success'] and PACKAGING_ENABLED:
+        processing_results['packaging'] = create_adaptive_package(filepath, filename, processing_results['info'])
+        if processing_results['packaging']:
+            update_video_packaging(video_id, processing_results['packaging'])
+            renditions = len(processing_results['packaging']['renditions'])
+            logger.info(f"Pacote HLS/DASH criado: {renditions} renditions")
+    
     return processing_results
 
 def callback(ch, method, properties, body):
-    """Callback executado quando uma mensagem é recebida da fila."""
+    """Callback executado quando uma mensagem é recebida da fila.
+    
+    O processamento corre numa thread própria para que a thread do consumidor
+    continue a servir os heartbeats do RabbitMQ durante vídeos longos; o
+    ack/nack é devolvido à thread da conexão com add_callback_threadsafe.
+    Cada consumidor tem no máximo PROCESSOR_PREFETCH vídeos em curso.
+    """
     try:
-        video_data = json.loads(body)
-        logger.info(f"Recebido para processamento: {video_data.get('filename')} (ID: {video_data.get('id')})")
-        
         # Atualizar métrica da fila
         queue_info = ch.queue_declare(queue='video_processing', passive=True)
         QUEUE_SIZE.set(queue_info.method.message_count)
+    except Exception as e:
+        logger.warning(f"Erro ao obter tamanho da fila: {e}")
+    
+    job = threading.Thread(target=handle_message, args=(ch, method.delivery_tag, body))
+    job.daemon = True
+    job.start()
+
+def handle_message(ch, delivery_tag, body):
+    """Processa uma mensagem fora da thread do consumidor."""
+    acknowledge = functools.partial(ch.basic_ack, delivery_tag=delivery_tag)
+    try:
+        video_data = json.loads(body)
+        logger.info(f"Recebido para processamento: {video_data.get('filename')} (ID: {video_data.get('id')})")
         
         # Buscar informações atualizadas do vídeo no MongoDB
         video_id = video_data.get('id')
@@ -366,7 +534,11 @@ def callback(ch, method, properties, body):
                 video_data.update(db_video_info)
         
         # Processar o vídeo
-        results = process_video(video_data)
+        ACTIVE_JOBS.inc()
+        try:
+            results = process_video(video_data)
+        finally:
+            ACTIVE_JOBS.dec()
         
         # Log dos resultados
         if results['success']:
@@ -374,13 +546,59 @@ def callback(ch, method, properties, body):
         else:
             logger.error(f"❌ Falha no processamento: {results['filename']} - Erros: {results['errors']}")
         
-        # Confirmar que a mensagem foi processada
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-        
     except Exception as e:
         logger.error(f"Erro no callback: {e}")
         # Rejeitar a mensagem e não reprocessar
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        acknowledge = functools.partial(ch.basic_nack, delivery_tag=delivery_tag, requeue=False)
+    
+    # Confirmar que a mensagem foi processada
+    try:
+        ch.connection.add_callback_threadsafe(acknowledge)
+    except Exception as e:
+        # Conexão perdida: a mensagem volta à fila e será reprocessada
+        logger.error(f"Erro ao confirmar mensagem {delivery_tag}: {e}")
+
+# Conexões ativas por consumidor, para as parar no shutdown
+consumers = {}
+consumers_lock = threading.Lock()
+shutdown_event = threading.Event()
+
+def consume_forever(worker_id):
+    """Loop de um consumidor: conexão e canal próprios, reconexão automática."""
+    while not shutdown_event.is_set():
+        connection = None
+        try:
+            connection, channel = connect_to_rabbitmq()
+            
+            if channel:
+                with consumers_lock:
+                    consumers[worker_id] = (connection, channel)
+                logger.info(f"🐰 Consumidor {worker_id} conectado ao RabbitMQ, aguardando mensagens...")
+                
+                # Configura o consumo da fila
+                channel.basic_consume(
+                    queue='video_processing', 
+                    on_message_callback=callback
+                )
+                
+                # Inicia o consumo de mensagens
+                channel.start_consuming()
+            else:
+                # Se falhar na conexão, aguarda e tenta novamente
+                logger.error(f"❌ Consumidor {worker_id}: falha na conexão com RabbitMQ, tentando novamente...")
+                time.sleep(5)
+                
+        except Exception as e:
+            logger.error(f"❌ Erro inesperado no consumidor {worker_id}: {e}")
+            time.sleep(5)
+        finally:
+            with consumers_lock:
+                consumers.pop(worker_id, None)
+            if connection and connection.is_open:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
 
 def main():
     """Função principal do processador de vídeos."""
@@ -407,34 +625,27 @@ def main():
     
     logger.info("Servidores de métricas e health check iniciados")
     
-    while True:
-        try:
-            connection, channel = connect_to_rabbitmq()
-            
-            if channel:
-                logger.info("🐰 Conectado ao RabbitMQ, aguardando mensagens...")
-                
-                # Configura o consumo da fila
-                channel.basic_consume(
-                    queue='video_processing', 
-                    on_message_callback=callback
-                )
-                
-                # Inicia o consumo de mensagens
-                channel.start_consuming()
-            else:
-                # Se falhar na conexão, aguarda e tenta novamente
-                logger.error("❌ Falha na conexão com RabbitMQ, tentando novamente...")
-                time.sleep(5)
-                
-        except KeyboardInterrupt:
-            logger.info("🛑 Processador de vídeos interrompido")
-            if 'connection' in locals() and connection and connection.is_open:
-                connection.close()
-            break
-        except Exception as e:
-            logger.error(f"❌ Erro inesperado: {e}")
-            time.sleep(5)
+    logger.info(f"A iniciar {PROCESSOR_WORKERS} consumidores (prefetch={PROCESSOR_PREFETCH})")
+    workers = []
+    for worker_id in range(PROCESSOR_WORKERS):
+        worker = threading.Thread(target=consume_forever, args=(worker_id,), name=f"consumer-{worker_id}")
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+    
+    try:
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=1)
+    except KeyboardInterrupt:
+        logger.info("🛑 Processador de vídeos interrompido")
+        shutdown_event.set()
+        with consumers_lock:
+            for connection, channel in list(consumers.values()):
+                if connection.is_open:
+                    connection.add_callback_threadsafe(channel.stop_consuming)
+        for worker in workers:
+            worker.join(timeout=10)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file